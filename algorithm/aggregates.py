@@ -0,0 +1,95 @@
+"""
+Running per-community totals for the array-backed Louvain engine. With these, the local measures can compute the gain
+of moving a node from the edges of that node alone, instead of rescanning every edge of the two communities involved.
+"""
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from algorithm.csr import CSRGraph, community_edge_weights
+
+if TYPE_CHECKING:
+    from algorithm.batch import Neighbourhood
+
+
+# Names of the arrays that make up the totals
+AGGREGATE_FIELDS = ("size", "internal", "boundary", "in_strength", "out_strength")
+
+
+class CommunityAggregates:
+    """
+    Totals of every community of the current Louvain level, indexed by community like `node_to_community`.
+
+    `internal` counts every edge inside the community once and `boundary` counts every edge with exactly one endpoint
+    in the community, like `edge_boundary_ratio` does. `in_strength` and `out_strength` are the summed weighted in- and
+    out-degrees of the members, and `size` is the number of members.
+    """
+
+    def __init__(self, G: CSRGraph, node_to_community: np.ndarray):
+        num_communities = int(node_to_community.max(initial=-1)) + 1
+        self.number_of_nodes = G.number_of_nodes()
+        self.size = np.bincount(node_to_community, minlength=num_communities)
+        self.internal, self.boundary = community_edge_weights(
+            G, node_to_community, num_communities
+        )
+        self.in_strength = np.bincount(
+            node_to_community, weights=G.in_strength, minlength=num_communities
+        )
+        self.out_strength = np.bincount(
+            node_to_community, weights=G.out_strength, minlength=num_communities
+        )
+
+    def move(self, G: CSRGraph, u: int, neighbourhood: "Neighbourhood", target: int):
+        """
+        Update the totals for moving u from its own community to `neighbourhood.communities[target]`.
+        """
+        _, source_after, _, targets_after = self.move_totals(G, u, neighbourhood)
+        source = neighbourhood.communities[0]
+        community = neighbourhood.communities[target]
+        self.internal[source], self.boundary[source], self.size[source] = source_after
+        for total, after in zip(
+            (self.internal, self.boundary, self.size), targets_after
+        ):
+            total[community] = after[target - 1]
+        self.in_strength[source] -= G.in_strength[u]
+        self.in_strength[community] += G.in_strength[u]
+        self.out_strength[source] -= G.out_strength[u]
+        self.out_strength[community] += G.out_strength[u]
+
+    def move_totals(self, G: CSRGraph, u: int, neighbourhood: "Neighbourhood"):
+        """
+        Internal and boundary weight and size of u's community and of every other community adjacent to u, before and
+        after moving u, without changing the totals.
+        :return: Tuple of (internal, boundary, size) triples: source before, source after, targets before, targets
+            after. The target triples hold arrays aligned with `neighbourhood.communities[1:]`.
+        """
+        source = neighbourhood.communities[0]
+        targets = neighbourhood.communities[1:]
+        self_loop = neighbourhood.self_loop
+        degree = G.in_strength[u] + G.out_strength[u]
+        weights = neighbourhood.out_weights + neighbourhood.in_weights
+        source_weight = weights[0]
+        target_weights = weights[1:]
+
+        source_before = (
+            self.internal[source],
+            self.boundary[source],
+            self.size[source],
+        )
+        source_after = (
+            self.internal[source] - source_weight - self_loop,
+            self.boundary[source] - degree + 2 * self_loop + 2 * source_weight,
+            self.size[source] - 1,
+        )
+        targets_before = (
+            self.internal[targets],
+            self.boundary[targets],
+            self.size[targets],
+        )
+        targets_after = (
+            self.internal[targets] + target_weights + self_loop,
+            self.boundary[targets] + degree - 2 * self_loop - 2 * target_weights,
+            self.size[targets] + 1,
+        )
+        return source_before, source_after, targets_before, targets_after
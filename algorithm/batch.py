@@ -0,0 +1,180 @@
+"""
+Batched local measures for the array-backed Louvain engine.
+
+A batched local measure gets the weights between a node u and every community adjacent to it, collected once from the
+in- and out-edges of u, and returns the gain of moving u to each of those communities in one call. Its signature is
+
+    batch_measure(G, u, neighbourhood, node_to_community, inner_partition, m, aggregates) -> np.ndarray
+
+The measures in `algorithm/` provide one through the `batch` attribute of their per-neighbour local measure.
+`as_batch` turns any other per-neighbour local measure into a batched one. A per-neighbour local measure can also have
+an `exact_gains` attribute, see `exact_gains`, and a `reads_aggregates` attribute, see `reads_aggregates`.
+"""
+
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from algorithm.aggregates import CommunityAggregates
+from algorithm.csr import CSRGraph
+
+
+class Neighbourhood(NamedTuple):
+    """
+    The communities adjacent to a node u, and the weights between u and each of them.
+
+    `communities[0]` is the community of u itself, the other communities follow in order of first appearance among
+    the successors and then the predecessors of u. A batched measure returns one gain for each of `communities[1:]`.
+    """
+
+    # Community ids, u's own community first
+    communities: np.ndarray
+    # A node of each community adjacent to u, u itself for its own community
+    representatives: np.ndarray
+    # Weight of the edges from u to the other members of each community
+    out_weights: np.ndarray
+    # Weight of the edges from the other members of each community to u
+    in_weights: np.ndarray
+    # Position in `communities` of the community of every successor and every predecessor of u
+    out_index: np.ndarray
+    in_index: np.ndarray
+    # Weight of the edge from u to itself
+    self_loop: float
+
+
+def neighbourhood(
+    G: CSRGraph, u: int, node_to_community: np.ndarray, extra_nodes=()
+) -> Neighbourhood:
+    """
+    Collect the communities adjacent to u in one pass over its edges.
+    :param G: The graph
+    :param u: The node
+    :param node_to_community: Label array mapping nodes to communities.
+    :param extra_nodes: Nodes whose communities should be included even if they are not adjacent to u. Their
+        communities come right after u's own community.
+    """
+    successors, out_wt = G.out_edges(u)
+    predecessors, in_wt = G.in_edges(u)
+    nodes = np.concatenate(
+        ([u], np.asarray(extra_nodes, dtype=successors.dtype), successors, predecessors)
+    )
+    communities, first, inverse = np.unique(
+        node_to_community[nodes], return_index=True, return_inverse=True
+    )
+    # np.unique sorts by community id, reorder by first appearance so u's own community comes first
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    position = rank[inverse.ravel()]
+
+    offset = 1 + len(extra_nodes)
+    out_index = position[offset : offset + len(successors)]
+    in_index = position[offset + len(successors) :]
+    out_not_loop = successors != u
+    in_not_loop = predecessors != u
+    return Neighbourhood(
+        communities=communities[order],
+        representatives=nodes[first[order]],
+        out_weights=np.bincount(
+            out_index[out_not_loop],
+            weights=out_wt[out_not_loop],
+            minlength=len(order),
+        ),
+        in_weights=np.bincount(
+            in_index[in_not_loop],
+            weights=in_wt[in_not_loop],
+            minlength=len(order),
+        ),
+        out_index=out_index,
+        in_index=in_index,
+        self_loop=out_wt[~out_not_loop].sum(),
+    )
+
+
+def best_move(
+    batch_measure: Callable,
+    G: CSRGraph,
+    u: int,
+    node_to_community: np.ndarray,
+    inner_partition,
+    m: int,
+    aggregates: CommunityAggregates,
+):
+    """
+    Evaluate moving u to every adjacent community with one call of a batched measure.
+    :return: Tuple (neighbourhood of u, index of the best community in `neighbourhood.communities`, gain), or None if
+        u has no neighbours outside its own community.
+    """
+    nbh = neighbourhood(G, u, node_to_community)
+    if len(nbh.communities) == 1:
+        return None
+    gains = batch_measure(G, u, nbh, node_to_community, inner_partition, m, aggregates)
+    best = int(np.argmax(gains))
+    return nbh, best + 1, gains[best]
+
+
+def as_batch(local_community_measure: Callable) -> Callable:
+    """
+    Get the batched version of a local measure. Measures without a `batch` attribute are wrapped in an adapter that
+    calls them once per adjacent community, with the first neighbour found in that community.
+    """
+    batch = getattr(local_community_measure, "batch", None)
+    if batch is not None:
+        return batch
+
+    def per_neighbour_batch(
+        G, u, neighbourhood, node_to_community, inner_partition, m, aggregates
+    ):
+        return np.array(
+            [
+                local_community_measure(
+                    G, u, neighbour, node_to_community, inner_partition, m
+                )
+                for neighbour in neighbourhood.representatives[1:].tolist()
+            ],
+            dtype=np.float64,
+        )
+
+    return per_neighbour_batch
+
+
+def neighbour_gain(
+    batch_measure: Callable,
+    G: CSRGraph,
+    u: int,
+    neighbour: int,
+    node_to_community: np.ndarray,
+    inner_partition,
+    m: int,
+    aggregates: CommunityAggregates = None,
+):
+    """
+    Evaluate a batched measure for a single neighbour in a different community than u, which is how the
+    per-neighbour local measures handle a `CSRGraph`. The community totals are computed from `node_to_community` when
+    not given.
+    """
+    if aggregates is None:
+        aggregates = CommunityAggregates(G, node_to_community)
+    nbh = neighbourhood(G, u, node_to_community, extra_nodes=(neighbour,))
+    gains = batch_measure(G, u, nbh, node_to_community, inner_partition, m, aggregates)
+    # The community of the neighbour comes right after the community of u
+    return gains[0]
+
+
+def exact_gains(local_community_measure: Callable) -> bool:
+    """
+    Whether the gains of a local measure are exactly the change of its global score on the original graph, on every
+    level of Louvain and with self loops, so that a running score can be kept by summing the gains of the moves.
+    Measures declare this with an `exact_gains` attribute set to True.
+    """
+    return getattr(local_community_measure, "exact_gains", False)
+
+
+def reads_aggregates(local_community_measure: Callable) -> bool:
+    """
+    Whether the gains of a local measure depend on the community totals in `CommunityAggregates`. Measures whose gains
+    only depend on the neighbourhood of u and the strengths of nodes set a `reads_aggregates` attribute to False. The
+    gains of those do not change when a node that is not adjacent to u moves, which parallel local moving uses to avoid
+    evaluating moves again.
+    """
+    return getattr(local_community_measure, "reads_aggregates", True)
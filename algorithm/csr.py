@@ -0,0 +1,257 @@
+"""
+Array-backed representation of a weighted directed graph, used by the "csr" engine of our Louvain implementation.
+
+Nodes are mapped to the contiguous ids 0..n-1 and both the out- and in-adjacency are stored in compressed sparse row
+(CSR) form, so walking the neighbours of a node is a slice of a NumPy array instead of a chain of dict lookups.
+"""
+
+from dataclasses import dataclass
+from functools import cached_property
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+from utils.partition import LabelPartition
+from utils.types import Partition
+
+
+@dataclass(frozen=True)
+class CSRGraph:
+    """
+    Weighted directed graph on the nodes 0..n-1.
+
+    `out_indices[out_indptr[u]:out_indptr[u + 1]]` are the successors of u and `out_weights` holds the matching edge
+    weights. The `in_*` arrays hold the predecessors in the same way. `nodes[u]` is the label u had in the graph this
+    one was created from.
+    """
+
+    nodes: list
+    out_indptr: np.ndarray
+    out_indices: np.ndarray
+    out_weights: np.ndarray
+    in_indptr: np.ndarray
+    in_indices: np.ndarray
+    in_weights: np.ndarray
+
+    @classmethod
+    def from_networkx(cls, G: nx.Graph, weight="weight") -> "CSRGraph":
+        """
+        Convert a networkx graph. Successors keep the order in which networkx reports them, so the array engine visits
+        neighbours in the same order as the networkx engine. Undirected graphs are treated as having an edge in both
+        directions, and edges without a weight get weight 1.
+        """
+        nodes = list(G.nodes())
+        node_index = {u: i for i, u in enumerate(nodes)}
+        G = G if G.is_directed() else G.to_directed(as_view=True)
+        num_edges = G.number_of_edges()
+        src = np.empty(num_edges, dtype=np.int32)
+        dst = np.empty(num_edges, dtype=np.int32)
+        weights = np.empty(num_edges, dtype=np.float64)
+        for i, (u, v, wt) in enumerate(G.edges(data=weight, default=1)):
+            src[i] = node_index[u]
+            dst[i] = node_index[v]
+            weights[i] = wt
+        return cls.from_edges(src, dst, weights, len(nodes), nodes=nodes)
+
+    @classmethod
+    def from_edges(
+        cls,
+        src: np.ndarray,
+        dst: np.ndarray,
+        weights: np.ndarray,
+        n: int,
+        nodes: list = None,
+    ) -> "CSRGraph":
+        """
+        Build a graph on the nodes 0..n-1 from parallel edge arrays. Edges with the same source keep their relative
+        order. Duplicate edges are not merged.
+        """
+        src = np.asarray(src, dtype=np.int32)
+        dst = np.asarray(dst, dtype=np.int32)
+        weights = np.asarray(weights, dtype=np.float64)
+        out_order = np.argsort(src, kind="stable")
+        in_order = np.argsort(dst, kind="stable")
+        return cls(
+            nodes=list(range(n)) if nodes is None else nodes,
+            out_indptr=_indptr(src, n),
+            out_indices=dst[out_order],
+            out_weights=weights[out_order],
+            in_indptr=_indptr(dst, n),
+            in_indices=src[in_order],
+            in_weights=weights[in_order],
+        )
+
+    @classmethod
+    def from_scipy(cls, A, nodes: list = None) -> "CSRGraph":
+        """
+        Build a graph from a square SciPy sparse matrix, where A[u, v] is the weight of the edge from u to v.
+        """
+        A = sparse.csr_array(A)
+        A.sum_duplicates()
+        A_in = sparse.csr_array(A.T)
+        A_in.sum_duplicates()
+        return cls(
+            nodes=list(range(A.shape[0])) if nodes is None else nodes,
+            out_indptr=A.indptr.astype(np.int64),
+            out_indices=A.indices.astype(np.int32),
+            out_weights=A.data.astype(np.float64),
+            in_indptr=A_in.indptr.astype(np.int64),
+            in_indices=A_in.indices.astype(np.int32),
+            in_weights=A_in.data.astype(np.float64),
+        )
+
+    def to_scipy(self) -> sparse.csr_array:
+        """
+        Out-adjacency as a SciPy sparse matrix, where A[u, v] is the weight of the edge from u to v.
+        """
+        n = self.number_of_nodes()
+        return sparse.csr_array(
+            (self.out_weights, self.out_indices, self.out_indptr), shape=(n, n)
+        )
+
+    def to_networkx(self) -> nx.DiGraph:
+        """
+        Convert back to a networkx DiGraph using the original node labels.
+        """
+        G = nx.DiGraph()
+        G.add_nodes_from(self.nodes)
+        src, dst, weights = self.edge_arrays()
+        G.add_weighted_edges_from(
+            zip(
+                (self.nodes[u] for u in src.tolist()),
+                (self.nodes[v] for v in dst.tolist()),
+                weights.tolist(),
+            )
+        )
+        return G
+
+    def number_of_nodes(self) -> int:
+        return len(self.out_indptr) - 1
+
+    def number_of_edges(self) -> int:
+        return len(self.out_indices)
+
+    def size(self) -> int:
+        """
+        Number of edges, like `nx.DiGraph.size()` without a weight argument.
+        """
+        return self.number_of_edges()
+
+    def successors(self, u: int) -> np.ndarray:
+        return self.out_indices[self.out_indptr[u] : self.out_indptr[u + 1]]
+
+    def out_edges(self, u: int):
+        """
+        :return: The successors of u and the weights of the edges to them.
+        """
+        start, end = self.out_indptr[u], self.out_indptr[u + 1]
+        return self.out_indices[start:end], self.out_weights[start:end]
+
+    def in_edges(self, u: int):
+        """
+        :return: The predecessors of u and the weights of the edges from them.
+        """
+        start, end = self.in_indptr[u], self.in_indptr[u + 1]
+        return self.in_indices[start:end], self.in_weights[start:end]
+
+    def edge_arrays(self):
+        """
+        :return: Parallel (src, dst, weight) arrays with one entry per edge, in out-adjacency order.
+        """
+        src = np.repeat(
+            np.arange(self.number_of_nodes(), dtype=np.int32),
+            np.diff(self.out_indptr),
+        )
+        return src, self.out_indices, self.out_weights
+
+    @cached_property
+    def out_strength(self) -> np.ndarray:
+        """
+        Weighted out-degree of every node.
+        """
+        src, _, weights = self.edge_arrays()
+        return np.bincount(src, weights=weights, minlength=self.number_of_nodes())
+
+    @cached_property
+    def in_strength(self) -> np.ndarray:
+        """
+        Weighted in-degree of every node.
+        """
+        return np.bincount(
+            self.out_indices,
+            weights=self.out_weights,
+            minlength=self.number_of_nodes(),
+        )
+
+    @cached_property
+    def node_index(self) -> dict:
+        """
+        Map from original node label to node id.
+        """
+        return {u: i for i, u in enumerate(self.nodes)}
+
+
+def labels_from_partition(partition: Partition, n: int) -> np.ndarray:
+    """
+    Convert a partition of the nodes 0..n-1 into a label array where labels[u] is the index of the community of u.
+    The labels of a `LabelPartition` of those nodes are returned as they are.
+    """
+    if isinstance(partition, LabelPartition) and partition.nodes is None:
+        return partition.labels
+    labels = np.empty(n, dtype=np.int32)
+    for i, community in enumerate(partition):
+        labels[np.fromiter(community, dtype=np.int64, count=len(community))] = i
+    return labels
+
+
+def partition_from_labels(labels: np.ndarray) -> Partition:
+    """
+    Convert a label array whose labels are 0..k-1 into a partition, the inverse of `labels_from_partition`.
+    """
+    if len(labels) == 0:
+        return []
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    return [set(community.tolist()) for community in np.split(order, bounds)]
+
+
+def community_edge_weights(
+    G: CSRGraph,
+    labels: np.ndarray,
+    num_communities: int,
+    internal_edges: np.ndarray = None,
+):
+    """
+    Sum the internal and boundary edge weights of every community at once.
+    :param G: The graph
+    :param labels: Label array assigning a community in 0..num_communities-1 to every node
+    :param num_communities: Number of communities
+    :param internal_edges: Optional mask of the edges of `G.edge_arrays()` with both endpoints in the same community,
+        if the caller already classified the edges.
+    :return: Tuple (internal, boundary) of arrays indexed by community. Every internal edge is counted once, every edge
+        with exactly one endpoint in a community counts towards its boundary.
+    """
+    src, dst, wt = G.edge_arrays()
+    src_labels = labels[src]
+    dst_labels = labels[dst]
+    if internal_edges is None:
+        internal_edges = src_labels == dst_labels
+    internal = np.bincount(
+        src_labels[internal_edges],
+        weights=wt[internal_edges],
+        minlength=num_communities,
+    )
+    boundary_wt = wt[~internal_edges]
+    boundary = np.bincount(
+        src_labels[~internal_edges], weights=boundary_wt, minlength=num_communities
+    ) + np.bincount(
+        dst_labels[~internal_edges], weights=boundary_wt, minlength=num_communities
+    )
+    return internal, boundary
+
+
+def _indptr(endpoints: np.ndarray, n: int) -> np.ndarray:
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(endpoints, minlength=n), out=indptr[1:])
+    return indptr
@@ -0,0 +1,92 @@
+"""
+The communities Louvain finds on every level, stored as one parent-label array per level. See `louvain_dendrogram` in
+`algorithm/louvain.py`.
+"""
+
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from utils.partition import LabelPartition
+
+
+class Dendrogram:
+    """
+    Hierarchy of communities: `parents[0]` holds the level 0 community of every original node, and `parents[k]` the
+    level k community of every level k-1 community. Every level takes one int32 per community of the level below it,
+    so the whole dendrogram takes little more memory than a single partition.
+    """
+
+    def __init__(self, parents: list, nodes: Sequence = None):
+        """
+        :param parents: The parent-label array of every level, see above.
+        :param nodes: The original node at every position of `parents[0]`. Defaults to the nodes 0..n-1.
+        """
+        self.parents = [np.asarray(parent, dtype=np.int32) for parent in parents]
+        self.nodes = nodes
+
+    @classmethod
+    def from_partitions(cls, partitions, nodes: Sequence = None) -> "Dendrogram":
+        """
+        Build a dendrogram from the partition of the original nodes on every level, as `louvain_partitions` and
+        `louvain_partitions_csr` yield them. Every partition must be a coarsening of the one before it.
+        """
+        parents = []
+        previous = None
+        for partition in partitions:
+            labels = LabelPartition.from_sets(partition, nodes).labels
+            if previous is None:
+                parents.append(labels)
+            else:
+                parent = np.empty(int(previous.max(initial=-1)) + 1, dtype=np.int32)
+                parent[previous] = labels
+                parents.append(parent)
+            previous = labels
+        return cls(parents, nodes)
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def labels(self, level: int = -1) -> np.ndarray:
+        """
+        Community of every original node on a level, the last level by default. The parent arrays are composed from
+        the top down, as they get smaller on every level, so this takes O(n) time.
+        """
+        level = range(len(self.parents))[level]
+        mapping = self.parents[level]
+        for parent in reversed(self.parents[1:level]):
+            mapping = mapping[parent]
+        if level == 0:
+            return mapping
+        return mapping[self.parents[0]]
+
+    def partition(self, level: int = -1) -> LabelPartition:
+        """
+        Partition of the original nodes on a level, the last level by default.
+        """
+        return LabelPartition(self.labels(level), self.nodes)
+
+    def save(self, path):
+        """
+        Write the dendrogram to a `.npz` file. The nodes are stored as a NumPy array, so they should be numbers or
+        strings.
+        """
+        arrays = {f"level_{level}": parent for level, parent in enumerate(self.parents)}
+        if self.nodes is not None:
+            nodes = np.asarray(self.nodes)
+            if nodes.dtype == object:
+                raise ValueError("Only numbers and strings can be saved as nodes")
+            arrays["nodes"] = nodes
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path) -> "Dendrogram":
+        """
+        Read a dendrogram written by `save`.
+        """
+        with np.load(Path(path)) as data:
+            num_levels = sum(1 for name in data.files if name.startswith("level_"))
+            parents = [data[f"level_{level}"] for level in range(num_levels)]
+            nodes = data["nodes"].tolist() if "nodes" in data.files else None
+        return cls(parents, nodes)
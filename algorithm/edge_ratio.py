@@ -1,5 +1,10 @@
 import networkx
+import numpy as np
 
+from algorithm.aggregates import CommunityAggregates
+from algorithm.batch import Neighbourhood, neighbour_gain
+from algorithm.csr import CSRGraph, labels_from_partition
+from algorithm.scoring import edge_ratio_score, edge_ratios
 from utils.types import Partition
 
 
@@ -11,6 +16,10 @@ def global_edge_ratio(G: networkx.DiGraph, partitions: Partition, _: int):
     :param _: size of the graph.
     :return: Edge ratio score
     """
+    if isinstance(G, CSRGraph):
+        return edge_ratio_score(
+            G, labels_from_partition(partitions, G.number_of_nodes()), _
+        )
     # Sum all partition scores.
     return sum(map(lambda partition: edge_boundary_ratio(G, partition), partitions))
 
@@ -22,6 +31,7 @@ def local_edge_ratio(
     node_to_community: dict,
     inner_partition: Partition,
     m: int,
+    aggregates: CommunityAggregates = None,
 ):
     """
     Calculates the change in score if u is moved to the community of the given neighbour.
@@ -31,8 +41,21 @@ def local_edge_ratio(
     :param node_to_community: Dictionary that maps nodes to communities.
     :param inner_partition: Partition in the current stage of louvain.
     :param m: Total amount of edges.
+    :param aggregates: Running community totals, only used with a `CSRGraph`. Computed from `node_to_community` when
+        not given.
     :return: Change in local score
     """
+    if isinstance(G, CSRGraph):
+        return neighbour_gain(
+            batch_local_edge_ratio,
+            G,
+            u,
+            neighbour,
+            node_to_community,
+            inner_partition,
+            m,
+            aggregates,
+        )
     # Calculate the current scores
     u_partition = inner_partition[node_to_community[u]]
     old_score_u = edge_boundary_ratio(G, u_partition)
@@ -80,3 +103,34 @@ def edge_boundary_ratio(G: networkx.DiGraph, partition):
     if in_edge_size == 0:
         return 0
     return in_edge_size / (edge_boundary_size + in_edge_size)
+
+
+def batch_local_edge_ratio(
+    G: CSRGraph,
+    u: int,
+    neighbourhood: Neighbourhood,
+    node_to_community: np.ndarray,
+    inner_partition: Partition,
+    m: int,
+    aggregates: CommunityAggregates,
+):
+    """
+    Batched version of `local_edge_ratio`. Calculates the change in score if u is moved to each of the communities in
+    `neighbourhood.communities[1:]`, from the running community totals.
+    :return: Array with the change in local score for every community
+    """
+    u_before, u_after, neighbour_before, neighbour_after = aggregates.move_totals(
+        G, u, neighbourhood
+    )
+    # The totals are (internal, boundary, size), the edge ratio does not depend on the size
+    return (
+        edge_ratios(*neighbour_after[:2])
+        + edge_ratios(*u_after[:2])
+        - edge_ratios(*u_before[:2])
+        - edge_ratios(*neighbour_before[:2])
+    )
+
+
+local_edge_ratio.batch = batch_local_edge_ratio
+# The edge ratio only depends on the internal and boundary weight of every community, which aggregation preserves
+local_edge_ratio.exact_gains = True
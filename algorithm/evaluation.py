@@ -0,0 +1,149 @@
+"""
+Comparison of a partition with a ground truth partition.
+
+Both partitions are given as integer label arrays, see `node_labels` in `algorithm/scoring.py`. They are counted into
+a single sparse contingency table, whose entry (i, j) is the number of nodes in true community i and found community
+j, and every metric is computed from that table. `evaluate` computes all of them at once.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+def contingency_table(labels_true: np.ndarray, labels_pred: np.ndarray) -> csr_matrix:
+    """
+    Sparse contingency table of two label arrays of the same nodes.
+    :param labels_true: Non-negative integer label of every node in the ground truth.
+    :param labels_pred: Non-negative integer label of every node in the partition that is evaluated.
+    :return: Matrix with a row for every true label and a column for every found label, up to the largest label.
+    """
+    labels_true = np.asarray(labels_true, dtype=np.int64)
+    labels_pred = np.asarray(labels_pred, dtype=np.int64)
+    if labels_true.shape != labels_pred.shape or labels_true.ndim != 1:
+        raise ValueError(
+            f"Label arrays of shapes {labels_true.shape} and {labels_pred.shape}"
+            " do not label the same nodes"
+        )
+    if labels_true.min(initial=0) < 0 or labels_pred.min(initial=0) < 0:
+        raise ValueError("Labels must be non-negative")
+    num_true = int(labels_true.max(initial=-1)) + 1
+    num_pred = int(labels_pred.max(initial=-1)) + 1
+    # Count every (true, found) pair by sorting the pairs, which also orders the entries as a CSR matrix needs
+    pairs = np.sort(labels_true * num_pred + labels_pred)
+    starts = np.flatnonzero(np.diff(pairs, prepend=-1))
+    counts = np.diff(starts, append=len(pairs))
+    rows, cols = np.divmod(pairs[starts], max(num_pred, 1))
+    return csr_matrix((counts, (rows, cols)), shape=(num_true, num_pred))
+
+
+def evaluate(labels_true: np.ndarray, labels_pred: np.ndarray) -> dict:
+    """
+    Compare a partition with the ground truth with every metric in this module, from one contingency table.
+    :return: Dict with the `nmi`, `ari` and `purity` of the partition, and the `precision` of every found community and
+        `recall` of every true community as arrays.
+    """
+    table = contingency_table(labels_true, labels_pred)
+    precision, recall = community_precision_recall(table)
+    return {
+        "nmi": normalized_mutual_info(table),
+        "ari": adjusted_rand_index(table),
+        "purity": purity(table),
+        "precision": precision,
+        "recall": recall,
+    }
+
+
+def normalized_mutual_info(table: csr_matrix) -> float:
+    """
+    Mutual information of the two partitions of a contingency table, divided by the mean of their entropies. The same
+    as `sklearn.metrics.normalized_mutual_info_score` with its default arithmetic mean.
+    """
+    n = table.sum()
+    true_sizes = np.asarray(table.sum(axis=1), dtype=np.float64).ravel()
+    pred_sizes = np.asarray(table.sum(axis=0), dtype=np.float64).ravel()
+    true_sizes_nonzero = true_sizes[true_sizes != 0]
+    pred_sizes_nonzero = pred_sizes[pred_sizes != 0]
+    if len(true_sizes_nonzero) == len(pred_sizes_nonzero) <= 1:
+        # Both partitions put every node in the same community, or there are no nodes
+        return 1.0
+    coo = table.tocoo()
+    counts = coo.data.astype(np.float64)
+    mutual_info = float(
+        np.sum(
+            counts
+            / n
+            * (
+                np.log(counts)
+                + np.log(n)
+                - np.log(true_sizes[coo.row])
+                - np.log(pred_sizes[coo.col])
+            )
+        )
+    )
+    if mutual_info <= 0:
+        return 0.0
+    normalizer = (_entropy(true_sizes_nonzero, n) + _entropy(pred_sizes_nonzero, n)) / 2
+    return min(mutual_info / max(normalizer, np.finfo(np.float64).eps), 1.0)
+
+
+def adjusted_rand_index(table: csr_matrix) -> float:
+    """
+    Rand index of the two partitions of a contingency table, adjusted for chance. The same as
+    `sklearn.metrics.adjusted_rand_score`.
+    """
+    n = int(table.sum())
+    # Numbers of pairs of nodes in the same community, as Python integers as their product overflows int64
+    same_both = _pairs(table.data)
+    same_true = _pairs(np.asarray(table.sum(axis=1)).ravel())
+    same_pred = _pairs(np.asarray(table.sum(axis=0)).ravel())
+    expected = same_true * same_pred / (n * (n - 1) // 2) if n > 1 else 0.0
+    maximum = (same_true + same_pred) / 2
+    if maximum == expected:
+        # Both partitions are trivial in the same way, such as every node on its own
+        return 1.0
+    return float((same_both - expected) / (maximum - expected))
+
+
+def purity(table: csr_matrix) -> float:
+    """
+    Fraction of the nodes that are in the true community most of their found community is in.
+    """
+    n = table.sum()
+    if n == 0:
+        return 1.0
+    return float(table.max(axis=0).sum() / n)
+
+
+def community_precision_recall(table: csr_matrix) -> tuple[np.ndarray, np.ndarray]:
+    """
+    :return: The precision of every found community, the fraction of its nodes in the true community it overlaps
+        most, and the recall of every true community, the fraction of its nodes in the found community it overlaps
+        most. Labels without nodes get 0.
+    """
+    best_true = table.max(axis=0).toarray().ravel()
+    best_pred = table.max(axis=1).toarray().ravel()
+    pred_sizes = np.asarray(table.sum(axis=0)).ravel()
+    true_sizes = np.asarray(table.sum(axis=1)).ravel()
+    precision = np.divide(
+        best_true,
+        pred_sizes,
+        out=np.zeros(len(pred_sizes)),
+        where=pred_sizes != 0,
+    )
+    recall = np.divide(
+        best_pred,
+        true_sizes,
+        out=np.zeros(len(true_sizes)),
+        where=true_sizes != 0,
+    )
+    return precision, recall
+
+
+def _entropy(sizes: np.ndarray, n) -> float:
+    p = sizes / n
+    return float(-np.sum(p * np.log(p)))
+
+
+def _pairs(counts: np.ndarray) -> int:
+    counts = counts.astype(np.int64)
+    return int(np.sum(counts * (counts - 1) // 2))
@@ -0,0 +1,74 @@
+"""
+Per-level statistics of the Louvain implementations.
+
+Both `louvain_partitions` and `louvain_partitions_csr` accept an `observer`, a function that is called once per level
+with a dict of statistics about that level. `LevelStatsCollector` is an observer that keeps these dicts and writes them
+to a JSON or CSV file.
+"""
+
+import csv
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+def peak_memory() -> dict:
+    """
+    Peak memory use so far: `peak_rss`, the peak resident set size of the process in bytes, and, while `tracemalloc`
+    is tracing, `peak_traced` in bytes. The traced peak is reset, so the next call reports the peak since this one.
+    """
+    stats = {}
+    if resource is not None:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        stats["peak_rss"] = peak_rss if sys.platform == "darwin" else peak_rss * 1024
+    if tracemalloc.is_tracing():
+        stats["peak_traced"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+    return stats
+
+
+class LevelStatsCollector:
+    """
+    Observer for Louvain that keeps the statistics of every level in `rows`. Every row also gets the fields of
+    `context`, such as the measure and seed of the run.
+
+    With `trace_memory`, `tracemalloc` is started when the collector is created, so the rows also hold the peak memory
+    allocated by Python and NumPy during each level. That gives a per-level peak, but slows Louvain down considerably.
+    """
+
+    def __init__(self, trace_memory: bool = False, **context):
+        self.rows = []
+        self.context = context
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, stats: dict):
+        self.rows.append({**self.context, **stats})
+
+    def save(self, path):
+        """
+        Write the rows to a `.json` or `.csv` file, depending on the extension of `path`.
+        """
+        path = Path(path)
+        if path.suffix == ".json":
+            with open(path, "w") as f:
+                json.dump(self.rows, f, indent=2)
+        elif path.suffix == ".csv":
+            # Rows of different engines have different fields
+            fields = list(dict.fromkeys(field for row in self.rows for field in row))
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(self.rows)
+        else:
+            raise ValueError(
+                f"Cannot save level statistics to {path}, use .json or .csv"
+            )
@@ -1,5 +1,10 @@
 import networkx
+import numpy as np
 
+from algorithm.aggregates import CommunityAggregates
+from algorithm.batch import Neighbourhood, neighbour_gain
+from algorithm.csr import CSRGraph, labels_from_partition
+from algorithm.scoring import intensity_ratio_score, intensity_ratios
 from utils.types import Partition
 
 
@@ -11,6 +16,10 @@ def global_intensity_ratio(G: networkx.DiGraph, partitions: Partition, _: int):
     :param _: size of the graph.
     :return: Intensity ratio score
     """
+    if isinstance(G, CSRGraph):
+        return intensity_ratio_score(
+            G, labels_from_partition(partitions, G.number_of_nodes()), _
+        )
     # Sum all partition scores.
     return sum(
         map(lambda partition: edge_boundary_intensity_ratio(G, partition), partitions)
@@ -24,6 +33,7 @@ def local_intensity_ratio(
     node_to_community: dict,
     inner_partition: Partition,
     m: int,
+    aggregates: CommunityAggregates = None,
 ):
     """
     Calculates the change in score if u is moved to the community of the given neighbour.
@@ -33,8 +43,21 @@ def local_intensity_ratio(
     :param node_to_community: Dictionary that maps nodes to communities.
     :param inner_partition: Partition in the current stage of louvain.
     :param m: Total amount of edges.
+    :param aggregates: Running community totals, only used with a `CSRGraph`. Computed from `node_to_community` when
+        not given.
     :return: Change in local score
     """
+    if isinstance(G, CSRGraph):
+        return neighbour_gain(
+            batch_local_intensity_ratio,
+            G,
+            u,
+            neighbour,
+            node_to_community,
+            inner_partition,
+            m,
+            aggregates,
+        )
     # Calculate the current scores
     u_partition = inner_partition[node_to_community[u]]
     old_score_u = edge_boundary_intensity_ratio(G, u_partition)
@@ -90,3 +113,32 @@ def edge_boundary_intensity_ratio(G: networkx.DiGraph, partition):
     p_in = in_edge_size / p_in_denom
     p_out = edge_boundary_size / p_out_denom
     return p_in / (p_out + p_in)
+
+
+def batch_local_intensity_ratio(
+    G: CSRGraph,
+    u: int,
+    neighbourhood: Neighbourhood,
+    node_to_community: np.ndarray,
+    inner_partition: Partition,
+    m: int,
+    aggregates: CommunityAggregates,
+):
+    """
+    Batched version of `local_intensity_ratio`. Calculates the change in score if u is moved to each of the
+    communities in `neighbourhood.communities[1:]`, from the running community totals.
+    :return: Array with the change in local score for every community
+    """
+    n = G.number_of_nodes()
+    u_before, u_after, neighbour_before, neighbour_after = aggregates.move_totals(
+        G, u, neighbourhood
+    )
+    return (
+        intensity_ratios(*neighbour_after, n)
+        + intensity_ratios(*u_after, n)
+        - intensity_ratios(*u_before, n)
+        - intensity_ratios(*neighbour_before, n)
+    )
+
+
+local_intensity_ratio.batch = batch_local_intensity_ratio
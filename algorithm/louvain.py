@@ -1,11 +1,34 @@
+import math
+import warnings
 from collections import deque
 from random import shuffle
+from time import perf_counter
 from typing import Callable
 
 import networkx as nx
+import numpy as np
+from scipy import sparse
 
+from algorithm.aggregates import CommunityAggregates
+from algorithm.batch import (
+    as_batch,
+    best_move,
+    exact_gains,
+    neighbourhood,
+    reads_aggregates,
+)
+from algorithm.csr import CSRGraph
+from algorithm.dendrogram import Dendrogram
+from algorithm.instrumentation import peak_memory
+from algorithm.parallel import PARALLEL_MIN_NODES, ParallelEvaluator, greedy_colouring
+from utils.partition import LabelPartition
 from utils.types import Partition
 
+ENGINES = ("networkx", "csr")
+
+# "sweep" visits every node again after any move, as in the paper. "queue" only revisits the neighbours of moved nodes.
+LOCAL_MOVING_MODES = ("sweep", "queue")
+
 
 def louvain_communities(
     G: nx.DiGraph,
@@ -13,6 +36,11 @@ def louvain_communities(
     local_community_measure: Callable[
         [nx.DiGraph, int, int, dict, Partition, int], float
     ],
+    engine: str = "networkx",
+    local_moving: str = "sweep",
+    observer: Callable[[dict], None] = None,
+    workers: int = 1,
+    check_score: bool = False,
 ):
     """
     Calculates the best partition for a given community measure using the louvain optimization algorithm.
@@ -26,17 +54,97 @@ def louvain_communities(
     local_community_measure:
         Function to calculate the local gain in community measure score if the node represented by the second argument
         is moved to the community of the node represented by the third argument.
+    engine:
+        "networkx" runs the algorithm on `G` directly, as used for the paper. "csr" converts `G` to a `CSRGraph` once
+        and runs the array-backed implementation, which is a lot faster on large graphs. It also considers moving a
+        node to the communities of its predecessors, not only its successors. The measures in `algorithm/` support
+        both.
+    local_moving:
+        How the "csr" engine moves nodes within a level, one of `LOCAL_MOVING_MODES`. "sweep" keeps sweeping over all
+        nodes until none of them moves, "queue" only re-evaluates nodes whose neighbour changed community.
+    observer:
+        Called with a dict of statistics after each level, see `louvain_partitions` and `louvain_partitions_csr`.
+    workers:
+        Number of worker processes the "csr" engine uses to evaluate moves in parallel. With more than one worker,
+        "sweep" moving runs in parallel on every level with at least `PARALLEL_MIN_NODES` nodes. This needs a local
+        measure with a batched version, like the ones in `algorithm/`.
+    check_score:
+        Debug option for the "csr" engine, which keeps a running score from the gains of the moves it makes instead of
+        recomputing the global score after each level, for local measures with exact gains. When set, the running
+        score is compared with the recomputed score after each level and a warning is given if they differ, see
+        `louvain_partitions_csr`.
+    :return:
+        The partition of `G` as a `LabelPartition`, which can be used as a list of sets. Each set represents one
+        community and contains all the nodes that constitute it.
+    """
+    return louvain_dendrogram(
+        G,
+        global_community_measure,
+        local_community_measure,
+        engine=engine,
+        local_moving=local_moving,
+        observer=observer,
+        workers=workers,
+        check_score=check_score,
+    ).partition()
+
+
+def louvain_dendrogram(
+    G: nx.DiGraph,
+    global_community_measure: Callable[[nx.DiGraph, Partition, int], float],
+    local_community_measure: Callable[
+        [nx.DiGraph, int, int, dict, Partition, int], float
+    ],
+    engine: str = "networkx",
+    local_moving: str = "sweep",
+    observer: Callable[[dict], None] = None,
+    workers: int = 1,
+    check_score: bool = False,
+) -> Dendrogram:
+    """
+    Runs the louvain optimization algorithm like `louvain_communities`, which takes the same parameters, but keeps the
+    communities of every level instead of only the last one.
+
     :return:
-        A list of sets (partition of `G`). Each set represents one community and contains
-        all the nodes that constitute it.
+        A `Dendrogram` of the nodes of `G`, with one level per level of the algorithm. `.partition(level)` gives the
+        partition of `G` on any level, and `.save` writes all levels to a `.npz` file.
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    if local_moving not in LOCAL_MOVING_MODES:
+        raise ValueError(
+            f"Unknown local moving mode {local_moving!r}, expected one of {LOCAL_MOVING_MODES}"
+        )
+    if engine == "networkx" and (
+        local_moving != "sweep" or workers != 1 or check_score
+    ):
+        raise ValueError(
+            'The networkx engine only supports local_moving="sweep" without workers or check_score'
+        )
+    if workers > 1 and local_moving != "sweep":
+        raise ValueError('Parallel local moving only supports local_moving="sweep"')
+    if engine == "csr":
+        graph = CSRGraph.from_networkx(G)
+        partitions = louvain_partitions_csr(
+            graph,
+            global_community_measure,
+            local_community_measure,
+            local_moving=local_moving,
+            observer=observer,
+            workers=workers,
+            check_score=check_score,
+        )
+        return Dendrogram.from_partitions(
+            (LabelPartition(partition.labels, graph.nodes) for partition in partitions),
+            graph.nodes,
+        )
     partitions = louvain_partitions(
         G,
         global_community_measure,
         local_community_measure,
+        observer=observer,
     )
-    q = deque(partitions, maxlen=1)
-    return q.pop()
+    return Dendrogram.from_partitions(partitions, list(G.nodes()))
 
 
 def louvain_partitions(
@@ -45,7 +153,8 @@ def louvain_partitions(
     local_community_measure: Callable[
         [nx.DiGraph, int, int, dict, Partition, int], float
     ],
-) -> list[set[int]]:
+    observer: Callable[[dict], None] = None,
+) -> LabelPartition:
     """Yields partitions for each level of the Louvain Community Detection Algorithm
 
     Parameters
@@ -57,14 +166,22 @@ def louvain_partitions(
     local_community_measure:
         Function to calculate the local gain in community measure score if the node represented by the second argument
         is moved to the community of the node represented by the third argument.
+    observer:
+        Optional function that is called once per level with a dict holding the `level` (starting at 0), the number
+        of `nodes` and `edges` of the graph of that level, the number of `sweeps` over the nodes, `evaluations` of the
+        local measure and `moves`, the seconds spent in `time_one_level` (local moving), `time_gen_graph` (aggregating
+        the graph for the next level) and `time_global_score`, and the peak memory use in bytes, see
+        `algorithm.instrumentation.peak_memory`. It is called after the level is aggregated, or when the algorithm
+        stops after it.
 
     Yields
     ------
-        A list of sets (partition of `G`). Each set represents one community and contains
-        all the nodes that constitute it.
+        A `LabelPartition` of `G`, labelling the nodes in the order of `G.nodes()`. Each community contains all the
+        nodes that constitute it.
     """
+    nodes = list(G.nodes())
     # Initially every node is its own partition
-    partition: Partition = [{u} for u in G.nodes()]
+    partition = LabelPartition(np.arange(len(nodes)), nodes)
 
     # Create a copy of the graph
     graph = G.__class__()
@@ -74,31 +191,70 @@ def louvain_partitions(
     m = graph.size()
 
     # Get initial community score
+    start = perf_counter()
     comm_score = global_community_measure(graph, partition, m)
+    time_global_score = perf_counter() - start
 
     # Don't look at improvement on the first iteration
-    partition, inner_partition, _ = _one_level(
-        graph, m, partition, local_community_measure
+    level = 0
+    start = perf_counter()
+    level_labels, inner_partition, _, stats = _one_level(
+        graph, m, local_community_measure
     )
+    stats = _level_stats(level, graph, stats, perf_counter() - start)
+    stats["time_global_score"] = time_global_score
     improvement = True
-    counter = 0
     while improvement:
-        counter += 1
+        # Compose the communities of the nodes of the original graph with those of this level
+        partition = partition.relabel(level_labels)
         yield partition
+        start = perf_counter()
         new_community_score = global_community_measure(G, partition, m)
+        stats["time_global_score"] += perf_counter() - start
         if abs(new_community_score - comm_score) <= 0.0000000000001:
+            _observe(observer, stats)
             return
         comm_score = new_community_score
+        start = perf_counter()
         graph = _gen_graph(graph, inner_partition)
-        partition, inner_partition, improvement = _one_level(
-            graph, m, partition, local_community_measure
+        stats["time_gen_graph"] = perf_counter() - start
+        _observe(observer, stats)
+        level += 1
+        start = perf_counter()
+        level_labels, inner_partition, improvement, stats = _one_level(
+            graph, m, local_community_measure
         )
+        stats = _level_stats(level, graph, stats, perf_counter() - start)
+    _observe(observer, stats)
+
+
+def _level_stats(level: int, G, stats: dict, time_one_level: float) -> dict:
+    """
+    Statistics of a level after local moving, including the `stats` of the local moving itself. The times of the
+    steps that follow start at 0.
+    """
+    return {
+        "level": level,
+        "nodes": G.number_of_nodes(),
+        "edges": G.number_of_edges(),
+        **stats,
+        "time_one_level": time_one_level,
+        "time_gen_graph": 0.0,
+        "time_global_score": 0.0,
+    }
+
+
+def _observe(observer: Callable[[dict], None], stats: dict):
+    """
+    Pass the statistics of a level to the observer, if there is one, together with the peak memory use.
+    """
+    if observer is not None:
+        observer({**stats, **peak_memory()})
 
 
 def _one_level(
     G,
     m: int,
-    partition: Partition,
     local_community_measure: Callable[
         [nx.DiGraph, int, int, dict, Partition, int], float
     ],
@@ -111,11 +267,15 @@ def _one_level(
         The graph from which to detect communities
     m : number
         The size of the graph `G`.
-    partition:
-        A valid partition of the graph `G`
     local_community_measure:
         Function to calculate the local gain in community measure score if the node represented by the second argument
         is moved to the community of the node represented by the third argument.
+
+    Returns
+    -------
+        A label array with the community of every node of `G`, in the order of `G.nodes()` and numbered like the
+        partition of the nodes of `G` that follows it, whether any node was moved, and a dict with the number of
+        sweeps, evaluations of the local measure and moves.
     """
 
     # Give each node its own community
@@ -127,7 +287,9 @@ def _one_level(
     shuffle(rand_nodes)
     nb_moves = 1
     improvement = False
+    stats = {"sweeps": 0, "evaluations": 0, "moves": 0}
     while nb_moves > 0:
+        stats["sweeps"] += 1
         nb_moves = 0
         for u in rand_nodes:
             best_community_score = 0.0000000000001
@@ -138,6 +300,7 @@ def _one_level(
                 if node_to_community[u] == node_to_community[neighbour]:
                     continue
                 # Calculate the gain if u is moved to the community of this neighbour
+                stats["evaluations"] += 1
                 new_score = local_community_measure(
                     G,
                     u,
@@ -152,20 +315,18 @@ def _one_level(
                 # best_com at the end of this will be the community that the node should now be in
 
             if best_com != node_to_community[u]:
-                com = G.nodes[u].get("nodes", {u})
-                # Update the global en local partitions
-                partition[node_to_community[u]].difference_update(com)
+                # Update the local partition
                 inner_partition[node_to_community[u]].remove(u)
-                partition[best_com].update(com)
                 inner_partition[best_com].add(u)
                 improvement = True
                 nb_moves += 1
+                stats["moves"] += 1
                 node_to_community[u] = best_com
 
     # Discard communities without any nodes.
-    partition = list(filter(len, partition))
     inner_partition = list(filter(len, inner_partition))
-    return partition, inner_partition, improvement
+    level_labels = LabelPartition.from_sets(inner_partition, list(G.nodes())).labels
+    return level_labels, inner_partition, improvement, stats
 
 
 def _gen_graph(G: nx.DiGraph, partition: Partition):
@@ -176,17 +337,16 @@ def _gen_graph(G: nx.DiGraph, partition: Partition):
     :param partition:
         The partition that should be used to transform the graph.
     :return:
-         A new graph for which each partition is now a node.
+         A new graph for which each partition is now a node. The original nodes in each node are not stored, Louvain
+         keeps track of them in a label array instead.
     """
     new_graph = G.__class__()
     node_community_map = {}
     # For each partition, create a node.
     for i, part in enumerate(partition):
-        nodes = set()
         for node in part:
             node_community_map[node] = i
-            nodes.update(G.nodes[node].get("nodes", {node}))
-        new_graph.add_node(i, nodes=nodes)
+        new_graph.add_node(i)
 
     # For each edge between two nodes in the original graph, add 1 weight to the edge between the nodes representing
     # the communities of the nodes.
@@ -196,3 +356,313 @@ def _gen_graph(G: nx.DiGraph, partition: Partition):
         temp = new_graph.get_edge_data(com1, com2, {"weight": 0})["weight"]
         new_graph.add_edge(com1, com2, **{"weight": weight + temp})
     return new_graph
+
+
+def louvain_partitions_csr(
+    G: CSRGraph,
+    global_community_measure: Callable[[CSRGraph, Partition, int], float],
+    local_community_measure: Callable[
+        [CSRGraph, int, int, np.ndarray, Partition, int], float
+    ],
+    local_moving: str = "sweep",
+    observer: Callable[[dict], None] = None,
+    workers: int = 1,
+    check_score: bool = False,
+):
+    """Yields partitions for each level of the Louvain Community Detection Algorithm, using the array-backed graph
+
+    Follows the same steps as `louvain_partitions`, but evaluates every community adjacent to a node, through both its
+    in- and out-edges, with a single call of the batched local measure (see `algorithm.batch`).
+
+    For local measures whose gains are exact changes of the global score on the original graph, on every level (see
+    `algorithm.batch.exact_gains`), the global score is only computed once, for the initial partition. After that a
+    running score is kept by adding the gains of the moves that are made. Of the measures in `algorithm/` that only
+    holds for the edge ratio. The gains of the other measures on the aggregated graphs, and on nodes with self loops,
+    differ from the change of the global score, so their global score is recomputed on `G` after every level, like
+    `louvain_partitions` does. Either way, the algorithm stops once a level does not change the score.
+
+    Parameters
+    ----------
+    G :
+        The graph for which to calculate the best communities.
+    global_community_measure:
+        Function to calculate the global score of a generic community structure measure. Gets called with a `CSRGraph`.
+    local_community_measure:
+        Function to calculate the local gain in community measure score if the node represented by the second argument
+        is moved to the community of the node represented by the third argument. Its `batch` version is used when it
+        has one, otherwise it gets called once per adjacent community with a `CSRGraph` and a label array mapping nodes
+        to communities.
+    local_moving:
+        "sweep" or "queue", see `louvain_communities`.
+    observer:
+        Optional function that is called once per level with the statistics `louvain_partitions` passes to its
+        observer. Here `evaluations` counts calls of the batched local measure, one per node, and `time_global_score`
+        only includes the initial score and `check_score` for measures with exact gains. It also holds the number of
+        parallel moves that had to be evaluated again because of a `conflicts` with an earlier move, and the
+        `conflict_rate`, the fraction of the moves the workers proposed that had a conflict. Finally, it holds the
+        `gain` of the level, which is the change of the global score, and the global `score` after it. In "queue" mode a sweep is
+        one pass over the nodes that were in the queue when it started.
+    workers:
+        Number of worker processes, see `louvain_communities`.
+    check_score:
+        Recompute the global score after each level and warn if it differs from the running score. Only has an effect
+        for measures with exact gains, as the score of the others is recomputed anyway.
+
+    Yields
+    ------
+        A `LabelPartition` of the node ids of `G`. Each community contains the ids of all the nodes that constitute it.
+    """
+    # Initially every node is its own partition
+    partition = LabelPartition(np.arange(G.number_of_nodes()))
+
+    m = G.size()
+    running_score = exact_gains(local_community_measure)
+
+    # Get initial community score, with exact gains later levels add the gains of their moves to it
+    start = perf_counter()
+    comm_score = float(global_community_measure(G, partition, m))
+    time_global_score = perf_counter() - start
+
+    # Don't look at improvement on the first iteration
+    graph = G
+    level = 0
+    start = perf_counter()
+    level_labels, _, stats = _one_level_csr(
+        graph, m, local_community_measure, local_moving, workers
+    )
+    stats = _level_stats(level, graph, stats, perf_counter() - start)
+    stats["time_global_score"] = time_global_score
+    improvement = True
+    while improvement:
+        # Compose the communities of the nodes of the original graph with those of this level
+        partition = partition.relabel(level_labels)
+        yield partition
+        start = perf_counter()
+        if running_score:
+            new_community_score = comm_score + stats["gain"]
+            if check_score:
+                _check_score(
+                    global_community_measure(G, partition, m),
+                    new_community_score,
+                    level,
+                )
+        else:
+            new_community_score = float(global_community_measure(G, partition, m))
+        stats["time_global_score"] += perf_counter() - start
+        stats["gain"] = new_community_score - comm_score
+        stats["score"] = new_community_score
+        if abs(new_community_score - comm_score) <= 0.0000000000001:
+            _observe(observer, stats)
+            return
+        comm_score = new_community_score
+        start = perf_counter()
+        graph = _gen_graph_csr(graph, level_labels)
+        stats["time_gen_graph"] = perf_counter() - start
+        _observe(observer, stats)
+        level += 1
+        start = perf_counter()
+        level_labels, improvement, stats = _one_level_csr(
+            graph, m, local_community_measure, local_moving, workers
+        )
+        stats = _level_stats(level, graph, stats, perf_counter() - start)
+        stats["score"] = comm_score
+    _observe(observer, stats)
+
+
+def _check_score(score: float, running_score: float, level: int):
+    """
+    Warn if the running score of a level differs from the recomputed global score.
+    """
+    if not math.isclose(score, running_score, rel_tol=1e-9, abs_tol=1e-9):
+        warnings.warn(
+            f"Running score {running_score} of level {level} differs from the global score {score} "
+            f"by {running_score - score}"
+        )
+
+
+def _one_level_csr(
+    G: CSRGraph,
+    m: int,
+    local_community_measure: Callable[
+        [CSRGraph, int, int, np.ndarray, Partition, int], float
+    ],
+    local_moving: str = "sweep",
+    workers: int = 1,
+):
+    """Calculate one level of the Louvain partitions tree on the array-backed graph
+
+    Parameters
+    ----------
+    G :
+        The graph from which to detect communities
+    m : number
+        The size of the original graph.
+    local_community_measure:
+        Function to calculate the local gain in community measure score if the node represented by the second argument
+        is moved to the community of the node represented by the third argument.
+    local_moving:
+        "sweep" or "queue", see `louvain_communities`.
+    workers:
+        Number of worker processes, see `louvain_communities`.
+
+    Returns
+    -------
+        A label array with the community of every node of `G`, numbered 0..k-1, whether any node was moved, and a dict
+        with the number of sweeps, evaluations, moves, conflicts and the conflict rate, and the summed gain of the
+        moves as given by the local measure.
+    """
+    n = G.number_of_nodes()
+
+    # Give each node its own community
+    node_to_community = np.arange(n, dtype=np.int32)
+    # Only read by per-neighbour measures that have no batched version
+    inner_partition = [{u} for u in range(n)]
+    aggregates = CommunityAggregates(G, node_to_community)
+
+    batch_measure = as_batch(local_community_measure)
+
+    stats = {
+        "sweeps": 0,
+        "evaluations": 0,
+        "moves": 0,
+        "conflicts": 0,
+        "conflict_rate": 0.0,
+        "gain": 0.0,
+    }
+
+    def apply_move(u, nbh, target, gain):
+        """
+        Move u to `nbh.communities[target]`, which has the given gain.
+        """
+        u_com = int(nbh.communities[0])
+        best_com = int(nbh.communities[target])
+        inner_partition[u_com].remove(u)
+        inner_partition[best_com].add(u)
+        aggregates.move(G, u, nbh, target)
+        node_to_community[u] = best_com
+        stats["moves"] += 1
+        stats["gain"] += float(gain)
+
+    def move_node(u):
+        """
+        Move u to the adjacent community with the best gain, if that gain is positive.
+        :return: Whether u was moved.
+        """
+        # Calculate the gain of moving u to each adjacent community at once
+        move = best_move(
+            batch_measure, G, u, node_to_community, inner_partition, m, aggregates
+        )
+        if move is None:
+            return False
+        stats["evaluations"] += 1
+        nbh, best, gain = move
+        if gain <= 0.0000000000001:
+            return False
+        apply_move(u, nbh, best, gain)
+        return True
+
+    # Go through the nodes in random order
+    rand_nodes = list(range(n))
+    shuffle(rand_nodes)
+    if workers > 1 and n >= PARALLEL_MIN_NODES:
+        # Nodes of one colour are never adjacent, so they can be evaluated at the same time
+        colours = greedy_colouring(G)
+        rank = np.empty(n, dtype=np.int64)
+        rank[rand_nodes] = np.arange(n)
+        order = np.argsort(rank)
+        colour_classes = [
+            order[colours[order] == colour] for colour in range(colours.max() + 1)
+        ]
+        # The gains of measures that do not read the community totals stay exact while other nodes of the same colour
+        # move, as none of them is adjacent to the node
+        check_conflicts = reads_aggregates(local_community_measure)
+        proposed = 0
+        with ParallelEvaluator(
+            G, aggregates, m, local_community_measure, workers
+        ) as evaluator:
+            nb_moves = 1
+            while nb_moves > 0:
+                stats["sweeps"] += 1
+                nb_moves = 0
+                for nodes in colour_classes:
+                    candidates, targets, gains = evaluator.best_moves(
+                        nodes, node_to_community, aggregates
+                    )
+                    stats["evaluations"] += len(candidates)
+                    # The workers saw the community totals from before this round, which are only still valid for
+                    # moves that do not share a community with an earlier move of this round.
+                    changed = set()
+                    for u, target, gain in zip(
+                        candidates.tolist(), targets.tolist(), gains.tolist()
+                    ):
+                        if gain <= 0.0000000000001:
+                            continue
+                        proposed += 1
+                        source = int(node_to_community[u])
+                        if check_conflicts and (source in changed or target in changed):
+                            stats["conflicts"] += 1
+                            if not move_node(u):
+                                continue
+                            target = int(node_to_community[u])
+                        else:
+                            nbh = neighbourhood(G, u, node_to_community)
+                            apply_move(
+                                u,
+                                nbh,
+                                int(np.flatnonzero(nbh.communities == target)[0]),
+                                gain,
+                            )
+                        changed.update((source, target))
+                        nb_moves += 1
+        if proposed:
+            stats["conflict_rate"] = stats["conflicts"] / proposed
+    elif local_moving == "queue":
+        queue = deque(rand_nodes)
+        queued = np.ones(n, dtype=bool)
+        sweep_remaining = 0
+        while queue:
+            if sweep_remaining == 0:
+                stats["sweeps"] += 1
+                sweep_remaining = len(queue)
+            sweep_remaining -= 1
+            u = queue.popleft()
+            queued[u] = False
+            if move_node(u):
+                # Only the neighbours of u can have a different best community now
+                for v in np.concatenate((G.successors(u), G.in_edges(u)[0])).tolist():
+                    if v != u and not queued[v]:
+                        queued[v] = True
+                        queue.append(v)
+    else:
+        nb_moves = 1
+        while nb_moves > 0:
+            stats["sweeps"] += 1
+            nb_moves = 0
+            for u in rand_nodes:
+                if move_node(u):
+                    nb_moves += 1
+
+    # Discard communities without any nodes.
+    _, level_labels = np.unique(node_to_community, return_inverse=True)
+    return level_labels.astype(np.int32), stats["moves"] > 0, stats
+
+
+def _gen_graph_csr(G: CSRGraph, node_to_community: np.ndarray):
+    """
+    Generate a new array-backed graph based on the communities of a given graph
+    :param G:
+        The graph to transform.
+    :param node_to_community:
+        Label array with the community of every node of `G`, numbered 0..k-1.
+    :return:
+         A new graph for which each community is now a node.
+    """
+    # This is P^T A P for the membership matrix P: relabelling both endpoints of every edge with their community and
+    # summing the weights of the resulting duplicate edges.
+    num_communities = int(node_to_community.max(initial=-1)) + 1
+    src, dst, wt = G.edge_arrays()
+    coarse = sparse.coo_array(
+        (wt, (node_to_community[src], node_to_community[dst])),
+        shape=(num_communities, num_communities),
+    )
+    return CSRGraph.from_scipy(coarse)
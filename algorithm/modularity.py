@@ -1,5 +1,10 @@
 import networkx
+import numpy as np
 
+from algorithm.aggregates import CommunityAggregates
+from algorithm.batch import Neighbourhood, neighbour_gain
+from algorithm.csr import CSRGraph, labels_from_partition
+from algorithm.scoring import modularity_score
 from utils.types import Partition
 
 
@@ -11,18 +16,23 @@ def global_modularity(G: networkx.DiGraph, partitions: Partition, m: int):
     :param m: size of the graph.
     :return: Edge ratio score
     """
+    if isinstance(G, CSRGraph):
+        return modularity_score(
+            G, labels_from_partition(partitions, G.number_of_nodes()), m
+        )
     score_sum = 0
+    # Sum the out-degree of every node once instead of for every edge that points to it
+    out_degree = dict(G.out_degree(weight="weight"))
     for partition in partitions:
         for u in partition:
-            u_in_degree = sum(map(lambda x: x[2], G.in_edges(u, "weight")))
+            u_in_degree = G.in_degree(u, weight="weight")
             for (
                 _,
                 n,
                 wt,
             ) in G.out_edges(u, "weight"):
                 if n in partition:
-                    n_out_degree = sum(map(lambda x: x[2], G.out_edges(n, "weight")))
-                    score_sum += wt - ((u_in_degree * n_out_degree) / m)
+                    score_sum += wt - ((u_in_degree * out_degree[n]) / m)
     return score_sum / m
 
 
@@ -33,6 +43,7 @@ def local_modularity(
     node_to_community: dict,
     inner_partition: Partition,
     m: int,
+    aggregates: CommunityAggregates = None,
 ):
     """
     Calculates the change in modularity score if u is moved to the community of the given neighbour.
@@ -42,8 +53,20 @@ def local_modularity(
     :param node_to_community: Dictionary that maps nodes to communities.
     :param inner_partition: Partition in the current stage of louvain.
     :param m: Total amount of edges.
+    :param aggregates: Running community totals, not needed for this measure.
     :return: Change in local score
     """
+    if isinstance(G, CSRGraph):
+        return neighbour_gain(
+            batch_local_modularity,
+            G,
+            u,
+            neighbour,
+            node_to_community,
+            inner_partition,
+            m,
+            aggregates,
+        )
 
     in_degree_u = sum(map(lambda x: x[2], G.in_edges(u, "weight")))
     out_degree_u = sum(map(lambda x: x[2], G.out_edges(u, "weight")))
@@ -117,3 +140,38 @@ def local_modularity(
     )
 
     return add_gain_in + add_gain_out - remove_loss_in - remove_loss_out
+
+
+def batch_local_modularity(
+    G: CSRGraph,
+    u: int,
+    neighbourhood: Neighbourhood,
+    node_to_community: np.ndarray,
+    inner_partition: Partition,
+    m: int,
+    aggregates: CommunityAggregates,
+):
+    """
+    Batched version of `local_modularity`. Calculates the change in modularity score if u is moved to each of the
+    communities in `neighbourhood.communities[1:]`.
+    :return: Array with the change in local score for every community
+    """
+    num_communities = len(neighbourhood.communities)
+    successors, out_wt = G.out_edges(u)
+    predecessors, in_wt = G.in_edges(u)
+    out_gain = np.bincount(
+        neighbourhood.out_index,
+        weights=out_wt - ((G.in_strength[u] * G.out_strength[successors]) / m),
+        minlength=num_communities,
+    )
+    in_gain = np.bincount(
+        neighbourhood.in_index,
+        weights=in_wt - ((G.in_strength[predecessors] * G.out_strength[u]) / m),
+        minlength=num_communities,
+    )
+    # Index 0 is the current community of u, which it is removed from
+    return in_gain[1:] + out_gain[1:] - in_gain[0] - out_gain[0]
+
+
+local_modularity.batch = batch_local_modularity
+local_modularity.reads_aggregates = False
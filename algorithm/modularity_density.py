@@ -1,6 +1,15 @@
 import networkx
+import numpy as np
 
-from algorithm.modularity import global_modularity, local_modularity
+from algorithm.aggregates import CommunityAggregates
+from algorithm.batch import Neighbourhood, neighbour_gain
+from algorithm.csr import CSRGraph, labels_from_partition
+from algorithm.modularity import (
+    batch_local_modularity,
+    global_modularity,
+    local_modularity,
+)
+from algorithm.scoring import modularity_density_score
 from utils.types import Partition
 
 
@@ -12,6 +21,10 @@ def global_modularity_density(G: networkx.DiGraph, partitions: Partition, m: int
     :param m: size of the graph.
     :return: Edge ratio score
     """
+    if isinstance(G, CSRGraph):
+        return modularity_density_score(
+            G, labels_from_partition(partitions, G.number_of_nodes()), m
+        )
     modularity_score = global_modularity(G, partitions, m)
 
     split_penalty = 0
@@ -36,6 +49,7 @@ def local_modularity_density(
     node_to_community: dict,
     inner_partition: Partition,
     m: int,
+    aggregates: CommunityAggregates = None,
 ):
     """
     Calculates the change in modularity score if u is moved to the community of the given neighbour.
@@ -45,8 +59,20 @@ def local_modularity_density(
     :param node_to_community: Dictionary that maps nodes to communities.
     :param inner_partition: Partition in the current stage of louvain.
     :param m: Total amount of edges.
+    :param aggregates: Running community totals, not needed for this measure.
     :return: Change in local score
     """
+    if isinstance(G, CSRGraph):
+        return neighbour_gain(
+            batch_local_modularity_density,
+            G,
+            u,
+            neighbour,
+            node_to_community,
+            inner_partition,
+            m,
+            aggregates,
+        )
     local_modularity_gain = local_modularity(
         G,
         u,
@@ -81,3 +107,30 @@ def local_modularity_density(
     return local_modularity_gain + (
         (split_penalty_decrease - split_penalty_increase) / m
     )
+
+
+def batch_local_modularity_density(
+    G: CSRGraph,
+    u: int,
+    neighbourhood: Neighbourhood,
+    node_to_community: np.ndarray,
+    inner_partition: Partition,
+    m: int,
+    aggregates: CommunityAggregates,
+):
+    """
+    Batched version of `local_modularity_density`. Calculates the change in score if u is moved to each of the
+    communities in `neighbourhood.communities[1:]`.
+    :return: Array with the change in local score for every community
+    """
+    local_modularity_gain = batch_local_modularity(
+        G, u, neighbourhood, node_to_community, inner_partition, m, aggregates
+    )
+    # Edges between u and a community stop being split when u joins it, and the edges to its current community start
+    # being split. Self loops are never split.
+    weights = neighbourhood.out_weights + neighbourhood.in_weights
+    return local_modularity_gain + ((weights[1:] - weights[0]) / m)
+
+
+local_modularity_density.batch = batch_local_modularity_density
+local_modularity_density.reads_aggregates = False
@@ -0,0 +1,184 @@
+"""
+Parallel local moving for the array-backed Louvain engine.
+
+The nodes of a level are coloured so that no two neighbours share a colour. The nodes of one colour are split into
+batches that worker processes evaluate concurrently, against the graph and a snapshot of the community labels and
+community totals held in shared memory. Because nodes of the same colour are never adjacent, moving one of them does
+not change the neighbourhood of another. For measures whose gains read the community totals, moves whose source or
+target community was already changed earlier in the same round are evaluated again against the current state before
+they are applied, see `_one_level_csr`. The gains of the other measures only depend on the neighbourhood, so those
+moves are always applied as the workers found them.
+"""
+
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable
+
+import numpy as np
+
+from algorithm.aggregates import AGGREGATE_FIELDS, CommunityAggregates
+from algorithm.batch import best_move
+from algorithm.csr import CSRGraph
+
+# Levels with fewer nodes than this are moved serially, as starting the workers would take longer than the level.
+PARALLEL_MIN_NODES = 1_000
+
+_GRAPH_FIELDS = (
+    "out_indptr",
+    "out_indices",
+    "out_weights",
+    "in_indptr",
+    "in_indices",
+    "in_weights",
+)
+
+# State of a worker process, set by _init_worker
+_worker = {}
+
+
+def greedy_colouring(G: CSRGraph) -> np.ndarray:
+    """
+    Colour the nodes so that no two nodes joined by an edge, in either direction, share a colour.
+    :return: Array with the colour of every node, numbered from 0.
+    """
+    out_indptr = G.out_indptr.tolist()
+    out_indices = G.out_indices.tolist()
+    in_indptr = G.in_indptr.tolist()
+    in_indices = G.in_indices.tolist()
+    colours = [-1] * G.number_of_nodes()
+    for u in range(G.number_of_nodes()):
+        used = {colours[v] for v in out_indices[out_indptr[u] : out_indptr[u + 1]]}
+        used.update(colours[v] for v in in_indices[in_indptr[u] : in_indptr[u + 1]])
+        colour = 0
+        while colour in used:
+            colour += 1
+        colours[u] = colour
+    return np.array(colours, dtype=np.int32)
+
+
+class ParallelEvaluator:
+    """
+    Pool of worker processes that find the best move of batches of nodes of one level. Use as a context manager.
+
+    The graph is copied to shared memory once. Before every call of `best_moves` the current community labels and
+    totals are copied there as well, so all workers evaluate against the same snapshot.
+    """
+
+    def __init__(
+        self,
+        G: CSRGraph,
+        aggregates: CommunityAggregates,
+        m: int,
+        local_community_measure: Callable,
+        workers: int,
+    ):
+        if getattr(local_community_measure, "batch", None) is None:
+            raise ValueError(
+                "Parallel local moving needs a local measure with a batched version"
+            )
+        self.workers = workers
+        self._blocks = []
+        self._shared = {}
+        spec = {}
+        arrays = {field: getattr(G, field) for field in _GRAPH_FIELDS}
+        arrays.update({field: getattr(aggregates, field) for field in AGGREGATE_FIELDS})
+        arrays["node_to_community"] = np.empty(G.number_of_nodes(), dtype=np.int32)
+        for name, array in arrays.items():
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            self._blocks.append(block)
+            self._shared[name] = np.ndarray(
+                array.shape, dtype=array.dtype, buffer=block.buf
+            )
+            self._shared[name][:] = array
+            spec[name] = (block.name, array.shape, array.dtype.str)
+        self._pool = multiprocessing.Pool(
+            workers,
+            initializer=_init_worker,
+            initargs=(spec, G.number_of_nodes(), m, local_community_measure),
+        )
+
+    def best_moves(
+        self,
+        nodes: np.ndarray,
+        node_to_community: np.ndarray,
+        aggregates: CommunityAggregates,
+    ):
+        """
+        Find the best move of every node against a snapshot of the given state.
+        :return: Tuple (nodes, target communities, gains) for the nodes that have a neighbour outside their own
+            community. Nodes that were evaluated are in the order they were given in.
+        """
+        self._shared["node_to_community"][:] = node_to_community
+        for field in AGGREGATE_FIELDS:
+            self._shared[field][:] = getattr(aggregates, field)
+        batches = np.array_split(nodes, min(self.workers, len(nodes)))
+        results = self._pool.map(_best_moves, batches)
+        return tuple(
+            np.concatenate([result[i] for result in results]) for i in range(3)
+        )
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+        # Views on the shared memory have to be gone before it can be closed
+        self._shared.clear()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _init_worker(spec: dict, number_of_nodes: int, m: int, local_community_measure):
+    blocks = []
+    arrays = {}
+    for name, (block_name, shape, dtype) in spec.items():
+        block = SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    aggregates = CommunityAggregates.__new__(CommunityAggregates)
+    aggregates.number_of_nodes = number_of_nodes
+    for field in AGGREGATE_FIELDS:
+        setattr(aggregates, field, arrays[field])
+    _worker.update(
+        blocks=blocks,
+        graph=CSRGraph(
+            nodes=list(range(number_of_nodes)),
+            **{field: arrays[field] for field in _GRAPH_FIELDS},
+        ),
+        node_to_community=arrays["node_to_community"],
+        aggregates=aggregates,
+        m=m,
+        batch_measure=local_community_measure.batch,
+    )
+
+
+def _best_moves(nodes: np.ndarray):
+    moved = []
+    targets = []
+    gains = []
+    for u in nodes.tolist():
+        move = best_move(
+            _worker["batch_measure"],
+            _worker["graph"],
+            u,
+            _worker["node_to_community"],
+            None,
+            _worker["m"],
+            _worker["aggregates"],
+        )
+        if move is None:
+            continue
+        nbh, best, gain = move
+        moved.append(u)
+        targets.append(nbh.communities[best])
+        gains.append(gain)
+    return (
+        np.array(moved, dtype=np.int64),
+        np.array(targets, dtype=np.int64),
+        np.array(gains, dtype=np.float64),
+    )
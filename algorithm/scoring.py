@@ -0,0 +1,179 @@
+"""
+Vectorized global scores of the four community measures, for a graph in array form and a label array.
+
+Every function gets a `CSRGraph`, a label array where labels[u] is the community of node u, and the size m of the
+graph, like the global measures get a partition. The edges are classified as internal or boundary per community in one
+pass with NumPy, and the in- and out-strength of every node is computed once per graph. The global measures in
+`algorithm/` stay the reference implementation on networkx graphs and use these functions for a `CSRGraph`.
+
+`score_report` computes all four measures of a partition at once, from one classification of the edges.
+"""
+
+import networkx as nx
+import numpy as np
+
+from algorithm.csr import CSRGraph, community_edge_weights
+from algorithm.evaluation import evaluate
+from utils.partition import LabelPartition
+from utils.types import Partition
+
+
+def modularity_score(G: CSRGraph, labels: np.ndarray, m: int) -> float:
+    """
+    Vectorized `global_modularity`.
+    """
+    src, dst, wt = G.edge_arrays()
+    return _modularity(G, src, dst, wt, labels[src] == labels[dst], m)
+
+
+def modularity_density_score(G: CSRGraph, labels: np.ndarray, m: int) -> float:
+    """
+    Vectorized `global_modularity_density`.
+    """
+    src, dst, wt = G.edge_arrays()
+    split_penalty = wt[labels[src] != labels[dst]].sum()
+    return modularity_score(G, labels, m) - (split_penalty / m)
+
+
+def edge_ratio_score(G: CSRGraph, labels: np.ndarray, _: int) -> float:
+    """
+    Vectorized `global_edge_ratio`.
+    """
+    internal, boundary = community_edge_weights(G, labels, _num_communities(labels))
+    return float(np.sum(edge_ratios(internal, boundary)))
+
+
+def intensity_ratio_score(G: CSRGraph, labels: np.ndarray, _: int) -> float:
+    """
+    Vectorized `global_intensity_ratio`.
+    """
+    num_communities = _num_communities(labels)
+    internal, boundary = community_edge_weights(G, labels, num_communities)
+    sizes = np.bincount(labels, minlength=num_communities)
+    return float(
+        np.sum(intensity_ratios(internal, boundary, sizes, G.number_of_nodes()))
+    )
+
+
+# Vectorized score of each measure, by the names used in `assess.py`
+SCORES = {
+    "edge_ratio": edge_ratio_score,
+    "intensity_ratio": intensity_ratio_score,
+    "modularity": modularity_score,
+    "modularity_density": modularity_density_score,
+}
+
+
+def score_report(
+    G, partition: Partition, ground_truth: Partition = None
+) -> dict[str, float]:
+    """
+    Score a partition with all four measures at once. The edges are classified as internal or boundary once, and the
+    modularity and the per-community totals the other measures are derived from are summed from that classification,
+    see `community_edge_weights`.
+    :param G: The graph, a `CSRGraph` or a networkx graph. A networkx graph is converted first, with weight 1 for edges
+        without a weight and both directions for undirected edges, so graphs from `load_network` work as well. Convert
+        once with `CSRGraph.from_networkx` when scoring several partitions of the same graph.
+    :param partition: Partition of the nodes of G.
+    :param ground_truth: Optional partition to compare with.
+    :return: Dict with the score of every measure in `SCORES` under its name, the number of communities as `size`, and
+        the `nmi`, `ari` and `purity` compared with the ground truth if one was given, see `algorithm.evaluation`.
+    """
+    if isinstance(G, nx.Graph):
+        G = CSRGraph.from_networkx(G)
+    labels = node_labels(G, partition)
+    num_communities = len(partition)
+    n = G.number_of_nodes()
+    m = G.size()
+
+    src, dst, wt = G.edge_arrays()
+    internal_edges = labels[src] == labels[dst]
+    internal, boundary = community_edge_weights(
+        G, labels, num_communities, internal_edges
+    )
+    sizes = np.bincount(labels, minlength=num_communities)
+    modularity = _modularity(G, src, dst, wt, internal_edges, m)
+    # Every boundary edge counts towards the boundary of both of its communities
+    split_penalty = boundary.sum() / 2
+    report = {
+        "edge_ratio": float(np.sum(edge_ratios(internal, boundary))),
+        "intensity_ratio": float(
+            np.sum(intensity_ratios(internal, boundary, sizes, n))
+        ),
+        "modularity": modularity,
+        "modularity_density": float(modularity - (split_penalty / m)),
+        "size": num_communities,
+    }
+    if ground_truth is not None:
+        evaluation = evaluate(node_labels(G, ground_truth), labels)
+        report.update(
+            nmi=evaluation["nmi"], ari=evaluation["ari"], purity=evaluation["purity"]
+        )
+    return report
+
+
+def edge_ratios(in_edge_size, edge_boundary_size):
+    """
+    Edge boundary ratio of one or more communities from their totals, see `edge_boundary_ratio`.
+    """
+    in_edge_size = np.asarray(in_edge_size, dtype=np.float64)
+    return np.divide(
+        in_edge_size,
+        edge_boundary_size + in_edge_size,
+        out=np.zeros_like(in_edge_size),
+        where=in_edge_size != 0,
+    )
+
+
+def intensity_ratios(in_edge_size, edge_boundary_size, size, n):
+    """
+    Edge boundary intensity ratio of one or more communities from their totals, see `edge_boundary_intensity_ratio`.
+    """
+    p_in_denom = size * (size - 1)
+    p_out_denom = 2 * size * (n - size)
+    scored = (p_in_denom != 0) & (p_out_denom != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_in = in_edge_size / p_in_denom
+        p_out = edge_boundary_size / p_out_denom
+        return np.where(scored, p_in / (p_out + p_in), 0)
+
+
+def node_labels(G: CSRGraph, partition: Partition) -> np.ndarray:
+    """
+    Label array of a partition of the original nodes of G, the ones in `G.nodes`. The labels of a `LabelPartition` are
+    used as they are when it labels the nodes in the same order.
+    """
+    if isinstance(partition, LabelPartition):
+        nodes = partition.nodes
+        if nodes is None:
+            nodes = range(len(partition.labels))
+        if len(nodes) == G.number_of_nodes() and list(nodes) == G.nodes:
+            return partition.labels
+        return np.array([partition.community_of(u) for u in G.nodes], dtype=np.int32)
+    node_index = G.node_index
+    labels = np.full(G.number_of_nodes(), -1, dtype=np.int32)
+    for i, community in enumerate(partition):
+        labels[[node_index[u] for u in community]] = i
+    if (labels < 0).any():
+        raise ValueError("The partition does not contain every node of the graph")
+    return labels
+
+
+def _modularity(
+    G: CSRGraph,
+    src: np.ndarray,
+    dst: np.ndarray,
+    wt: np.ndarray,
+    internal_edges: np.ndarray,
+    m: int,
+) -> float:
+    """
+    Modularity from the edge arrays of G and the mask of its edges within a community.
+    """
+    src, dst, wt = src[internal_edges], dst[internal_edges], wt[internal_edges]
+    return float(np.sum(wt - ((G.in_strength[src] * G.out_strength[dst]) / m)) / m)
+
+
+def _num_communities(labels: np.ndarray) -> int:
+    # Labels do not have to be contiguous, communities without nodes score 0
+    return int(labels.max(initial=-1)) + 1
@@ -4,10 +4,10 @@ and records the results in CSV files.
 """
 
 import csv
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-from sklearn.metrics import normalized_mutual_info_score
-
 from algorithm.edge_ratio import (
     local_edge_ratio,
     global_edge_ratio,
@@ -24,9 +24,15 @@ from algorithm.modularity_density import (
     local_modularity_density,
     global_modularity_density,
 )
-from graph_generation_fs import generate_fs_graph
+from graph_cache import cached_fs_graph
+from graph_generation_sbm import generate_sbm_graph
+from partition_cache import cached_louvain_communities
 
-from algorithm.louvain import louvain_communities
+from algorithm.csr import CSRGraph
+from algorithm.evaluation import contingency_table, normalized_mutual_info
+from algorithm.instrumentation import LevelStatsCollector
+from algorithm.scoring import score_report
+from utils.partition import LabelPartition
 from utils.types import Partition, Labels
 
 GRAPH_SIZE = 5_000
@@ -45,42 +51,71 @@ RANDOM_GRAPH_SEEDS = (
 )
 
 # For each community measure, we provide a name and a function that
-# runs our Louvain algorithm with the given measure.
+# runs our Louvain algorithm with the given measure, or gets its result from the partition cache.
+# Keyword arguments of the function are passed on to louvain_communities.
 COMMUNITY_MEASURES = {
     "edge_ratio": {
         "name": "Edge Ratio",
-        "partition_func": lambda G: louvain_communities(
+        "partition_func": lambda G, **options: cached_louvain_communities(
             G,
             global_edge_ratio,
             local_edge_ratio,
+            **options,
         ),
     },
     "intensity_ratio": {
         "name": "Intensity Ratio",
-        "partition_func": lambda G: louvain_communities(
+        "partition_func": lambda G, **options: cached_louvain_communities(
             G,
             global_intensity_ratio,
             local_intensity_ratio,
+            **options,
         ),
     },
     "modularity": {
         "name": "Modularity",
-        "partition_func": lambda G: louvain_communities(
+        "partition_func": lambda G, **options: cached_louvain_communities(
             G,
             global_modularity,
             local_modularity,
+            **options,
         ),
     },
     "modularity_density": {
         "name": "Modularity Density",
-        "partition_func": lambda G: louvain_communities(
+        "partition_func": lambda G, **options: cached_louvain_communities(
             G,
             global_modularity_density,
             local_modularity_density,
+            **options,
         ),
     },
 }
 
+# For each family of synthetic graphs, a function that generates a graph of the given size from a seed.
+GRAPH_FAMILIES = {
+    "fs": cached_fs_graph,
+    "sbm": generate_sbm_graph,
+}
+
+# Every finished benchmark cell is stored here, see run_benchmarks
+RESULTS_STORE = Path("data", "benchmark_cells.csv")
+
+# Columns of the results store and their types
+RESULTS_STORE_FIELDS = {
+    "Graph Family": str,
+    "Graph Size": int,
+    "Measure": str,
+    "Seed": int,
+    "NMI": float,
+    "ARI": float,
+    "Purity": float,
+    "Score": float,
+    "Ground Truth Score": float,
+    "Partition Size": int,
+    "Ground Truth Partition Size": int,
+}
+
 NAME_TO_GLOBAL_FUNC = {
     "edge_ratio": global_edge_ratio,
     "intensity_ratio": global_intensity_ratio,
@@ -92,9 +127,14 @@ NAME_TO_GLOBAL_FUNC = {
 def nmi_format_partition(partition: Partition) -> Labels:
     """
     Convert a partition to a format that can be used by NMI.
-    :param partition: A list of sets of nodes where each set represents a community/label.
+    :param partition: A list of sets of nodes where each set represents a community/label, or a `LabelPartition`.
     :return: A single list of labels where labels[i] is the label of the i-th node.
     """
+    if isinstance(partition, LabelPartition):
+        if partition.nodes is None:
+            return partition.labels.tolist()
+        order = sorted(range(len(partition.nodes)), key=partition.nodes.__getitem__)
+        return partition.labels[order].tolist()
     node_comm_dict = {
         node: comm for comm, nodes in enumerate(partition) for node in nodes
     }
@@ -103,8 +143,10 @@ def nmi_format_partition(partition: Partition) -> Labels:
 
 
 def nmi_score(labels_true: Partition, labels_pred: Partition) -> float:
-    return normalized_mutual_info_score(
-        nmi_format_partition(labels_true), nmi_format_partition(labels_pred)
+    return normalized_mutual_info(
+        contingency_table(
+            nmi_format_partition(labels_true), nmi_format_partition(labels_pred)
+        )
     )
 
 
@@ -114,37 +156,69 @@ def run_benchmarks(
     graph_size=GRAPH_SIZE,
     summary_output_file=Path("data", "benchmark_results.csv"),
     full_output_file=Path("data", "benchmark_results_full.csv"),
+    graph_family="fs",
+    workers=1,
+    results_store=RESULTS_STORE,
+    level_stats_file=None,
 ):
     """
     Testing procedure: for each synthetic graph (created from seed), run the louvain algorithm with each measure.
     Then, compare the resulting partitions with the ground truth partition using NMI.
+    The synthetic graphs are generated by GRAPH_FAMILIES[graph_family].
+
+    Every (measure, seed) cell is appended to `results_store` as soon as it finishes, and cells that are already in
+    there are skipped, so an interrupted run continues where it stopped. Delete the store to run every cell again.
+    With more than one worker, the cells run in that many processes. The CSV files are written from the store.
+
+    With a `level_stats_file` (.json or .csv), the statistics of every Louvain level of the cells that run are written
+    there, see `algorithm.instrumentation`. Those cells bypass the partition cache.
     """
+    level_stats = LevelStatsCollector()
+    collect_level_stats = level_stats_file is not None
+    completed = read_results_store(results_store)
+    pending = [
+        (measure, seed)
+        for measure in measures
+        for seed in graph_seeds
+        if (graph_family, graph_size, measure, seed) not in completed
+    ]
+    skipped = len(measures) * len(graph_seeds) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} cells that are already in {results_store}")
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [
+                executor.submit(
+                    run_benchmark_cell,
+                    measure,
+                    seed,
+                    graph_size,
+                    graph_family,
+                    collect_level_stats,
+                )
+                for measure, seed in pending
+            ]
+            for future in as_completed(futures):
+                row, rows = future.result()
+                append_to_results_store(results_store, row)
+                level_stats.rows.extend(rows)
+    else:
+        for measure, seed in pending:
+            row, rows = run_benchmark_cell(
+                measure, seed, graph_size, graph_family, collect_level_stats
+            )
+            append_to_results_store(results_store, row)
+            level_stats.rows.extend(rows)
+    if collect_level_stats:
+        level_stats.save(level_stats_file)
+
+    completed = read_results_store(results_store)
     nmi_results: dict[str, dict] = {}
     for measure in measures:
-        print(f"Running benchmark for measure {measure}...")
-        nmi_scores = []
-        for seed in graph_seeds:
-            G = generate_fs_graph(graph_size, seed=seed)
-            # Run the louvain algorithm with the given measure. and get the resulting partition.
-            partition = COMMUNITY_MEASURES[measure]["partition_func"](G)
-            ground_truth_partition = G.graph["partition"]
-            # Log the measure scores for both the partition and the ground truth partition.
-            print(
-                f"{measure} for ground truth:"
-                f" {NAME_TO_GLOBAL_FUNC[measure](G, ground_truth_partition, G.size())}"
-            )
-            print(
-                f"{measure} for algorithm:"
-                f" {NAME_TO_GLOBAL_FUNC[measure](G, partition, G.size())}"
-            )
-            print(f"Ground truth partition size: {len(ground_truth_partition)}")
-            print(f"Algorithm partition size: {len(partition)}")
-            # Compute the NMI score between the partition and the ground truth partition.
-            nmi_scores.append(nmi_score(ground_truth_partition, partition))
-            print(
-                f"Measure {measure}, Seed {seed}: NMI"
-                f" {nmi_score(ground_truth_partition, partition)}"
-            )
+        nmi_scores = [
+            completed[(graph_family, graph_size, measure, seed)]["NMI"]
+            for seed in graph_seeds
+        ]
         nmi_results[measure] = {
             "full_results": nmi_scores,
             "mean_nmi": sum(nmi_scores) / len(nmi_scores),
@@ -152,16 +226,110 @@ def run_benchmarks(
         nmi_results[measure]["variance_nmi"] = sum(
             [(x - nmi_results[measure]["mean_nmi"]) ** 2 for x in nmi_scores]
         ) / len(nmi_scores)
-    save_benchmark_results(nmi_results, summary_output_file, full_output_file)
+    save_benchmark_results(
+        nmi_results, summary_output_file, full_output_file, graph_seeds
+    )
 
 
-def save_benchmark_results(nmi_results, summary_output_file, full_output_file):
+def run_benchmark_cell(
+    measure, seed, graph_size=GRAPH_SIZE, graph_family="fs", collect_level_stats=False
+):
+    """
+    Run the louvain algorithm with one measure on the synthetic graph of one seed, and compare the resulting partition
+    with the ground truth partition.
+    :return: A row for the results store, see RESULTS_STORE_FIELDS, and the statistics of every Louvain level if
+        `collect_level_stats` is set.
+    """
+    print(f"Running benchmark for measure {measure}, seed {seed}...")
+    # Every measure runs on the same graphs, which are only generated once
+    G = GRAPH_FAMILIES[graph_family](graph_size, seed)
+    # Run the louvain algorithm with the given measure. and get the resulting partition.
+    level_stats = LevelStatsCollector(
+        graph_family=graph_family, graph_size=graph_size, measure=measure, seed=seed
+    )
+    options = {"observer": level_stats} if collect_level_stats else {}
+    partition = COMMUNITY_MEASURES[measure]["partition_func"](G, **options)
+    ground_truth_partition = G.graph["partition"]
+    # Score both partitions with every measure, and the partition against the ground truth with NMI.
+    graph = CSRGraph.from_networkx(G)
+    ground_truth_report = score_report(graph, ground_truth_partition)
+    report = score_report(graph, partition, ground_truth_partition)
+    # Log the measure scores for both the partition and the ground truth partition.
+    print(f"{measure} for ground truth: {ground_truth_report[measure]}")
+    print(f"{measure} for algorithm: {report[measure]}")
+    print(f"Ground truth partition size: {ground_truth_report['size']}")
+    print(f"Algorithm partition size: {report['size']}")
+    print(
+        f"Measure {measure}, Seed {seed}: NMI {report['nmi']}, ARI {report['ari']},"
+        f" Purity {report['purity']}"
+    )
+    return {
+        "Graph Family": graph_family,
+        "Graph Size": graph_size,
+        "Measure": measure,
+        "Seed": seed,
+        "NMI": report["nmi"],
+        "ARI": report["ari"],
+        "Purity": report["purity"],
+        "Score": report[measure],
+        "Ground Truth Score": ground_truth_report[measure],
+        "Partition Size": report["size"],
+        "Ground Truth Partition Size": ground_truth_report["size"],
+    }, level_stats.rows
+
+
+def read_results_store(results_store) -> dict[tuple, dict]:
+    """
+    Read the cells in the results store.
+    :return: A dictionary from (graph family, graph size, measure, seed) to the row of that cell.
+    """
+    if not Path(results_store).exists():
+        return {}
+    with open(results_store, newline="") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    if reader.fieldnames != list(RESULTS_STORE_FIELDS):
+        raise ValueError(
+            f"{results_store} has columns {reader.fieldnames}, expected"
+            f" {list(RESULTS_STORE_FIELDS)}. It was written by an older version, delete it"
+            " to run the benchmarks again"
+        )
+    completed = {}
+    for row in rows:
+        row = {
+            field: column_type(row[field])
+            for field, column_type in RESULTS_STORE_FIELDS.items()
+        }
+        key = (row["Graph Family"], row["Graph Size"], row["Measure"], row["Seed"])
+        completed[key] = row
+    return completed
+
+
+def append_to_results_store(results_store, row: dict):
+    """
+    Append a finished cell to the results store, and make sure it is on disk before continuing.
+    """
+    results_store = Path(results_store)
+    new_store = not results_store.exists()
+    with open(results_store, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(RESULTS_STORE_FIELDS))
+        if new_store:
+            writer.writeheader()
+        writer.writerow(row)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def save_benchmark_results(
+    nmi_results, summary_output_file, full_output_file, graph_seeds=RANDOM_GRAPH_SEEDS
+):
     """
     Save the benchmark results to two CSV files. One file contains a statistical
     summary of the results, and the other contains the results on a granular level.
     :param nmi_results: A dictionary of the form {measure: {full_results: list[float], mean_nmi: float, variance_nmi: float}}
     :param summary_output_file: The path to the summary CSV file.
     :param full_output_file: The path to the full results CSV file.
+    :param graph_seeds: The seeds of the graphs, in the order of the full results.
     """
     with open(summary_output_file, "w") as f:
         writer = csv.writer(f)
@@ -172,7 +340,7 @@ def save_benchmark_results(nmi_results, summary_output_file, full_output_file):
         writer = csv.writer(f)
         writer.writerow(["Measure", "Seed", "NMI"])
         for measure, results in nmi_results.items():
-            for seed, nmi in zip(RANDOM_GRAPH_SEEDS, results["full_results"]):
+            for seed, nmi in zip(graph_seeds, results["full_results"]):
                 writer.writerow([measure, seed, nmi])
 
 
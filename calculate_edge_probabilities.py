@@ -1,107 +1,162 @@
 # Get edge probabilities between different communities of the graph to feed into the stochastic block model
-import pickle
-from collections import defaultdict
+from typing import NamedTuple
 
-import networkx as nx
 import csv
 from pathlib import Path
-import powerlaw
+import numpy as np
 
-from load_network import load_network
+from load_network import open_network
+from network_cache import NO_COURT
+from power_law import PowerLawFit, fit_power_law
+
+EDGE_PROBABILITIES_PATH = Path("data", "edge_probabilities.csv")
+COMMUNITY_SIZES_PATH = Path("data", "community_sizes.csv")
+
+
+class CommunityStatistics(NamedTuple):
+    """
+    Statistics of the ground-truth communities (courts) of the citation network. Communities are numbered in the order
+    of `court_names`, which is the order in which they first occur in the nodes.
+    """
+
+    court_names: list[str]
+    # Number of nodes in every community
+    community_sizes: np.ndarray
+    # edge_counts[a, b] is the number of edges from community a to community b
+    edge_counts: np.ndarray
+    # Probability of an edge between two distinct nodes of communities a and b
+    edge_probabilities: np.ndarray
+    # Pairs (a, b) with at least one edge, in the order of their first edge
+    community_pairs: np.ndarray
+    # Fraction of the edges between nodes with a community that are between two separate communities
+    inter_community_edge_fraction: float
+    # In- and out-degree of every node
+    in_degrees: np.ndarray
+    out_degrees: np.ndarray
+
+    def degrees(self) -> np.ndarray:
+        """
+        Degree of every node, the same as `G.degree()` of a DiGraph.
+        """
+        return self.in_degrees + self.out_degrees
 
 
 def main():
-    G = load_network()
+    network = open_network()
     # "court" field contains ground truth community labels
-    # nodes_by_community = defaultdict(set)
-    # for node in G.nodes:
-    #     court = G.nodes[node].get("court", None)
-    #     # Ignore nodes without a ground truth community label
-    #     if court is not None:
-    #         nodes_by_community[court].add(node)
-    # create_edge_prob_csv(G, nodes_by_community)
-    # create_community_size_csv(nodes_by_community)
-    print(estimate_power_law_degree_exponent(G))
-    print(f"Inter-community edge fraction: {inter_community_edge_fraction(G)}")
-
-
-def create_edge_prob_csv(G, nodes_by_community):
-    # Count number of edges between each pair of communities
-    edges_by_community_pair = defaultdict(int)
-    for u, v in G.edges:
-        u_court = G.nodes[u].get("court", None)
-        v_court = G.nodes[v].get("court", None)
-        if u_court is not None and v_court is not None:
-            edges_by_community_pair[(u_court, v_court)] += 1
+    src, dst = network.edge_arrays()
+    stats = community_statistics(
+        src, dst, np.asarray(network.courts), network.court_names.tolist()
+    )
+    create_edge_prob_csv(stats)
+    create_community_size_csv(stats)
+    print(estimate_power_law_degree_exponent(stats))
+    print(f"Inter-community edge fraction: {stats.inter_community_edge_fraction}")
+
+
+def community_statistics(
+    src: np.ndarray, dst: np.ndarray, courts: np.ndarray, court_names: list[str]
+) -> CommunityStatistics:
+    """
+    Compute all statistics of the communities at once from the edge arrays.
+    :param src: Source node of every edge.
+    :param dst: Target node of every edge.
+    :param courts: Community of every node, an index into `court_names`, or `NO_COURT` for nodes without one.
+    :param court_names: Name of every community.
+    """
+    n = len(courts)
+    courts = np.asarray(courts, dtype=np.int64)
+    # Number the communities in the order in which they first occur in the nodes
+    labelled = np.flatnonzero(courts != NO_COURT)
+    first_node = np.full(len(court_names), n)
+    np.minimum.at(first_node, courts[labelled], labelled)
+    order = np.argsort(first_node, kind="stable")
+    order = order[first_node[order] < n]
+    renumber = np.full(len(court_names), NO_COURT, dtype=np.int64)
+    renumber[order] = np.arange(len(order))
+    courts = np.where(courts != NO_COURT, renumber[courts], NO_COURT)
+    k = len(order)
+
+    # Count number of edges between each pair of communities, ignoring nodes without one
+    src_courts = courts[src]
+    dst_courts = courts[dst]
+    counted = (src_courts != NO_COURT) & (dst_courts != NO_COURT)
+    pairs = src_courts[counted] * k + dst_courts[counted]
+    edge_counts = np.bincount(pairs, minlength=k * k).reshape(k, k)
+    # Pairs in the order of their first edge
+    first_edge = np.full(k * k, len(pairs))
+    np.minimum.at(first_edge, pairs, np.arange(len(pairs)))
+    pair_order = np.argsort(first_edge, kind="stable")[: np.count_nonzero(edge_counts)]
+    community_pairs = np.column_stack(np.divmod(pair_order, k))
+
     # Normalize edge probabilities out of number of possible edges between each pair of communities
-    edge_probabilities = {}
-    for (u_court, v_court), count in edges_by_community_pair.items():
-        denom = len(nodes_by_community[u_court]) * len(nodes_by_community[v_court])
-        if u_court == v_court:
-            # Within the same community, # of possible edges is n(n-1)
-            denom -= len(nodes_by_community[u_court])
-        edge_probabilities[(u_court, v_court)] = count / denom
+    community_sizes = np.bincount(courts[labelled], minlength=k)
+    denom = np.outer(community_sizes, community_sizes)
+    # Within the same community, # of possible edges is n(n-1)
+    denom[np.diag_indices(k)] -= community_sizes
+    edge_probabilities = np.divide(
+        edge_counts,
+        denom,
+        out=np.zeros((k, k)),
+        where=denom != 0,
+    )
+
+    counted_edges = len(pairs)
+    inter_community_edges = counted_edges - int(np.trace(edge_counts))
+    return CommunityStatistics(
+        court_names=[court_names[court] for court in order.tolist()],
+        community_sizes=community_sizes,
+        edge_counts=edge_counts,
+        edge_probabilities=edge_probabilities,
+        community_pairs=community_pairs,
+        inter_community_edge_fraction=(
+            inter_community_edges / counted_edges if counted_edges else float("nan")
+        ),
+        in_degrees=np.bincount(dst, minlength=n),
+        out_degrees=np.bincount(src, minlength=n),
+    )
+
+
+def create_edge_prob_csv(
+    stats: CommunityStatistics, path: Path = EDGE_PROBABILITIES_PATH
+):
     # Write edge probabilities to file
-    with open(Path("data", "edge_probabilities.csv"), "w") as f:
+    with open(path, "w") as f:
         writer = csv.writer(f)
-        for (u_court, v_court), probability in edge_probabilities.items():
-            writer.writerow([u_court, v_court, probability])
-
-
-def create_community_size_csv(nodes_by_community: dict[set]):
+        for a, b in stats.community_pairs.tolist():
+            writer.writerow(
+                [
+                    stats.court_names[a],
+                    stats.court_names[b],
+                    float(stats.edge_probabilities[a, b]),
+                ]
+            )
+
+
+def create_community_size_csv(
+    stats: CommunityStatistics, path: Path = COMMUNITY_SIZES_PATH
+):
     # Relative size of each community
-    total_nodes = sum(len(nodes) for nodes in nodes_by_community.values())
-    with open(Path("data", "community_sizes.csv"), "w") as f:
+    total_nodes = int(stats.community_sizes.sum())
+    with open(path, "w") as f:
         writer = csv.writer(f)
-        for community, nodes in nodes_by_community.items():
-            writer.writerow([community, len(nodes) / total_nodes])
-
-
-def estimate_power_law_degree_exponent(G):
-    community_size_fit, degree_distrib_fit = power_law_fits(G)
-    cache_powerlaw_fits(community_size_fit, degree_distrib_fit)
-    return degree_distrib_fit.power_law.alpha, community_size_fit.power_law.alpha
-
-
-def power_law_fits(G):
-    degrees = [d for n, d in G.degree()]
-    degree_distrib_fit = powerlaw.Fit(degrees)
-    # Now do a powerlaw fit for the community sizes
-    nodes_by_community = defaultdict(set)
-    for node in G.nodes:
-        court = G.nodes[node].get("court", None)
-        if court is not None:
-            nodes_by_community[court].add(node)
-    community_sizes = [len(nodes) for nodes in nodes_by_community.values()]
-    community_size_fit = powerlaw.Fit(community_sizes)
-    return community_size_fit, degree_distrib_fit
+        for community, size in zip(stats.court_names, stats.community_sizes.tolist()):
+            writer.writerow([community, size / total_nodes])
 
 
-def cache_powerlaw_fits(community_size_fit, degree_distrib_fit):
-    pickle_cache = {
-        "degree_distrib_fit": degree_distrib_fit,
-        "community_size_fit": community_size_fit,
-    }
-    with open(Path("data", "powerlaw_fits.pik"), "wb") as f:
-        pickle.dump(pickle_cache, f)
+def estimate_power_law_degree_exponent(stats: CommunityStatistics):
+    community_size_fit, degree_distrib_fit = power_law_fits(stats)
+    return degree_distrib_fit.alpha, community_size_fit.alpha
 
 
-def inter_community_edge_fraction(G):
+def power_law_fits(stats: CommunityStatistics) -> tuple[PowerLawFit, PowerLawFit]:
     """
-    Calculates the fraction of edges that are between two separate communities
-    :param G: NetworkX graph
-    :return: fraction of edges that are between two separate communities
+    Fit power laws to the degrees and the community sizes. Fits are cached on disk by `fit_power_law`.
     """
-    inter_community_edges = 0
-    total_edges = 0
-    for u, v in G.edges:
-        u_court = G.nodes[u].get("court", None)
-        v_court = G.nodes[v].get("court", None)
-        if u_court is not None and v_court is not None:
-            total_edges += 1
-            if u_court != v_court:
-                inter_community_edges += 1
-    return inter_community_edges / total_edges
+    degree_distrib_fit = fit_power_law(stats.degrees())
+    # Now do a powerlaw fit for the community sizes, there are only a few of them so every size is a candidate xmin
+    community_size_fit = fit_power_law(stats.community_sizes, min_tail=2)
+    return community_size_fit, degree_distrib_fit
 
 
 if __name__ == "__main__":
@@ -1,26 +1,83 @@
-from collections import Counter
+"""
+Plot the degree distribution of the citation network. The histograms come from `degree_statistics.py`, which caches
+them, so only the first plot reads the network.
 
+Run `python degree_histogram.py --help` for the options.
+"""
+
+import click
 import matplotlib.pyplot as plt
 
-from load_network import load_network
+from degree_statistics import (
+    DEGREE_KINDS,
+    LOG_BINS_PER_DECADE,
+    cached_degree_histograms,
+    ccdf,
+    degree_distribution,
+    log_binned,
+)
+
+KIND_LABELS = {"in": "In-degree", "out": "Out-degree", "total": "Degree"}
+
+
+@click.command()
+@click.option(
+    "--kind",
+    type=click.Choice(list(DEGREE_KINDS)),
+    default="total",
+    show_default=True,
+    help="Which degree to plot.",
+)
+@click.option(
+    "--log-bins/--no-log-bins",
+    default=False,
+    help="Average p_k over logarithmically sized bins of degrees.",
+)
+@click.option(
+    "--bins-per-decade", default=LOG_BINS_PER_DECADE, show_default=True, type=int
+)
+@click.option(
+    "--ccdf",
+    "plot_ccdf",
+    is_flag=True,
+    help="Plot the fraction of nodes with at least degree k instead of p_k.",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Save the plot to this file instead of showing it.",
+)
+def main(kind, log_bins, bins_per_decade, plot_ccdf, output):
+    histogram = cached_degree_histograms().histogram(kind)
+    if plot_ccdf:
+        x, y = ccdf(histogram)
+        ylabel = "$P(K \\geq k)$"
+    elif log_bins:
+        x, y = log_binned(histogram, bins_per_decade)
+        ylabel = "$p_k$"
+    else:
+        x, y = degree_distribution(histogram)
+        ylabel = "$p_k$"
+    # Degree 0 has no place on the logarithmic axis
+    y = y[x > 0]
+    x = x[x > 0]
 
-G = load_network()
-degrees = [deg for _, deg in G.degree()]
-degree_freq = Counter(degrees)
-x, y = zip(*degree_freq.items())
+    plt.figure(1)
 
-total_degree = sum(y)
-y = [y / total_degree for y in y]
+    plt.xlabel("$k$")
+    plt.xscale("log")
+    plt.ylabel(ylabel)
+    plt.yscale("log")
+    plt.title(f"{KIND_LABELS[kind]} Distribution")
 
-# Plot histogram
-plt.figure(1)
+    plt.scatter(x, y, marker=".")
 
-plt.xlabel("$k$")
-plt.xscale("log")
-plt.ylabel("$p_k$")
-plt.yscale("log")
-plt.title("Degree Distribution")
+    if output is None:
+        plt.show()
+    else:
+        plt.savefig(output)
 
-plt.scatter(x, y, marker=".")
 
-plt.show()
+if __name__ == "__main__":
+    main()
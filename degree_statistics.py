@@ -0,0 +1,149 @@
+"""
+Degree distributions of the citation network, computed from the arrays of `open_network` without building a networkx
+graph.
+
+The in-degrees are counted in blocks of edges, so apart from the memory-mapped network only a few arrays of one entry
+per node are held in memory. The histograms are cached in `data/degree_cache/`, keyed by the same hash of the source
+CSV files as the network cache, so plotting them again does not open the network at all. `degree_histogram.py` plots
+them.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from load_network import EDGE_CSV_PATH, METADATA_CSV_PATH, open_network
+from network_cache import NETWORK_CACHE_DIR, CitationNetwork, network_key
+
+DEGREE_CACHE_DIR = Path("data", "degree_cache")
+
+# Increase when the contents of the cached histograms change
+DEGREE_CACHE_VERSION = 1
+
+# Number of edges whose targets are counted at once
+DEGREE_BLOCK_SIZE = 2**22
+
+LOG_BINS_PER_DECADE = 10
+
+# Field of `DegreeHistograms` of every kind of degree
+DEGREE_KINDS = {"in": "in_degree", "out": "out_degree", "total": "degree"}
+
+
+class DegreeHistograms(NamedTuple):
+    """
+    `in_degree[k]` is the number of nodes with in-degree k, and likewise for the out-degree and the total degree, which
+    is the degree `G.degree()` gives in a DiGraph.
+    """
+
+    in_degree: np.ndarray
+    out_degree: np.ndarray
+    degree: np.ndarray
+
+    def histogram(self, kind: str = "total") -> np.ndarray:
+        """
+        :param kind: "in", "out" or "total".
+        """
+        if kind not in DEGREE_KINDS:
+            raise ValueError(
+                f"Unknown degree kind {kind!r}, expected one of {list(DEGREE_KINDS)}"
+            )
+        return getattr(self, DEGREE_KINDS[kind])
+
+
+def degree_histograms(
+    network: CitationNetwork, block_size: int = DEGREE_BLOCK_SIZE
+) -> DegreeHistograms:
+    """
+    Count the nodes of every in-, out- and total degree of the network.
+    :param network: The network, as `open_network` returns it.
+    :param block_size: Number of edges that are read at once.
+    """
+    n = network.number_of_nodes()
+    out_degrees = np.diff(network.indptr)
+    in_degrees = np.zeros(n, dtype=np.int64)
+    for start in range(0, network.number_of_edges(), block_size):
+        in_degrees += np.bincount(
+            network.indices[start : start + block_size], minlength=n
+        )
+    return DegreeHistograms(
+        in_degree=np.bincount(in_degrees),
+        out_degree=np.bincount(out_degrees),
+        degree=np.bincount(in_degrees + out_degrees),
+    )
+
+
+def cached_degree_histograms(
+    metadata_csv: Path = METADATA_CSV_PATH,
+    edge_csv: Path = EDGE_CSV_PATH,
+    cache_dir: Path = DEGREE_CACHE_DIR,
+    network_cache_dir: Path = NETWORK_CACHE_DIR,
+) -> DegreeHistograms:
+    """
+    The degree histograms of the citation network in the given CSV files. They are computed from `open_network` if
+    they are not cached yet, or if either file changed since.
+    """
+    key = hashlib.sha256(
+        f"version {DEGREE_CACHE_VERSION} {network_key(edge_csv, metadata_csv)}".encode()
+    ).hexdigest()
+    path = Path(cache_dir, f"{key}.npz")
+    if path.exists():
+        with np.load(path) as data:
+            return DegreeHistograms(
+                **{field: data[field] for field in DegreeHistograms._fields}
+            )
+    histograms = degree_histograms(
+        open_network(metadata_csv, edge_csv, network_cache_dir)
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first, so a reader never sees partially written histograms
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **histograms._asdict())
+    os.replace(tmp_path, path)
+    return histograms
+
+
+def degree_distribution(histogram: np.ndarray):
+    """
+    :return: The degrees k that occur and the fraction p_k of the nodes that have them.
+    """
+    degrees = np.flatnonzero(histogram)
+    return degrees, histogram[degrees] / histogram.sum()
+
+
+def ccdf(histogram: np.ndarray):
+    """
+    Complementary cumulative distribution of the degrees.
+    :return: The degrees k that occur and the fraction P(K >= k) of the nodes with at least that degree.
+    """
+    degrees = np.flatnonzero(histogram)
+    at_least = np.cumsum(histogram[::-1])[::-1]
+    return degrees, at_least[degrees] / at_least[0]
+
+
+def log_binned(histogram: np.ndarray, bins_per_decade: int = LOG_BINS_PER_DECADE):
+    """
+    Degree distribution averaged over logarithmically sized bins of degrees, which evens out the noise in the tail.
+    Nodes of degree 0 are left out, as they have no place on a logarithmic scale, but still count towards the total.
+    :param histogram: Number of nodes of every degree.
+    :param bins_per_decade: Number of bins per factor 10 of degrees. Bins that would hold no integer are merged into
+        the next one.
+    :return: The geometric center of every bin with nodes in it, and the average p_k of the degrees in the bin.
+    """
+    max_degree = len(histogram) - 1
+    if max_degree < 1:
+        return np.empty(0), np.empty(0)
+    num_bins = int(np.ceil(np.log10(max_degree + 1) * bins_per_decade))
+    # Integer bin edges, every bin holds the degrees edges[i] <= k < edges[i + 1]
+    edges = np.floor(10 ** (np.arange(num_bins + 1) / bins_per_decade)).astype(np.int64)
+    edges = edges[np.append(True, np.diff(edges) > 0)]
+    edges[-1] = max_degree + 1
+    below = np.append(0, np.cumsum(histogram))
+    counts = below[edges[1:]] - below[edges[:-1]]
+    widths = np.diff(edges)
+    centers = np.sqrt(edges[:-1] * (edges[1:] - 1))
+    nonempty = counts > 0
+    return centers[nonempty], counts[nonempty] / widths[nonempty] / below[-1]
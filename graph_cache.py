@@ -0,0 +1,116 @@
+"""
+On-disk cache of the synthetic benchmark graphs, so every graph is only generated once.
+
+Graphs are stored as compact edge arrays in a `.npz` file whose name is a hash of the generator parameters: the size
+and seed, the constants of `graph_generation_fs`, `GENERATOR_VERSION` and `CACHE_FORMAT`. Changing any of these gives
+a new key, so stale graphs are never read. An in-process LRU cache on top returns the same graph object for repeated calls.
+"""
+
+import hashlib
+import json
+import os
+import random
+from functools import lru_cache
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+
+import graph_generation_fs
+from graph_generation_fs import generate_fs_graph
+
+GRAPH_CACHE_DIR = Path("data", "graph_cache")
+
+# Number of graphs the in-process cache holds
+GRAPH_CACHE_SIZE = 16
+
+# Increase when the contents of the cache files change
+CACHE_FORMAT = 2
+
+
+def fs_graph_key(n: int, seed) -> str:
+    """
+    Key of the graph `generate_fs_graph(n, seed=seed)` generates with the current generator constants.
+    """
+    params = {
+        "generator": "fs",
+        "format": CACHE_FORMAT,
+        "version": graph_generation_fs.GENERATOR_VERSION,
+        "n": n,
+        "seed": seed,
+        "avg_degree": graph_generation_fs.AVG_DEGREE,
+        "scaling_factor": graph_generation_fs.SCALING_FACTOR,
+        "degree_alpha": graph_generation_fs.DEGREE_ALPHA,
+        "comm_fractions": graph_generation_fs.COMM_FRACTIONS,
+        "inter_community_frac": graph_generation_fs.INTER_COMMUNITY_FRAC,
+        # The degrees are drawn with nx.utils.powerlaw_sequence
+        "networkx": nx.__version__,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def cached_fs_graph(n: int, seed=None, cache_dir: Path = GRAPH_CACHE_DIR) -> nx.DiGraph:
+    """
+    Cached version of `generate_fs_graph`. The returned graph is shared between callers, so it should not be modified.
+
+    The graph is read from `cache_dir` if it was generated before, and generated and written there otherwise. It has
+    the same nodes, attributes, edges and neighbour order as the generated graph. With a seed, the global `random`
+    state is also left as `generate_fs_graph` leaves it, so the node order Louvain shuffles afterwards is the same as
+    well.
+    """
+    # The in-process cache is keyed like the files, so a change of a generator constant is never served from memory
+    G, random_state = _load_fs_graph(fs_graph_key(n, seed), n, seed, cache_dir)
+    if seed is not None:
+        random.setstate(random_state)
+    return G
+
+
+@lru_cache(maxsize=GRAPH_CACHE_SIZE)
+def _load_fs_graph(key: str, n: int, seed, cache_dir: Path):
+    path = Path(cache_dir, f"{key}.npz")
+    if path.exists():
+        return _read_graph(path)
+    G = generate_fs_graph(n, seed=seed)
+    random_state = random.getstate()
+    _write_graph(G, random_state, path)
+    return G, random_state
+
+
+def _write_graph(G: nx.DiGraph, random_state: tuple, path: Path):
+    edges = np.array(list(G.edges()), dtype=np.int32).reshape(-1, 2)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first, so a reader never sees a partially written graph
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez(
+        tmp_path,
+        src=edges[:, 0],
+        dst=edges[:, 1],
+        communities=np.array(
+            [data["community"] for _, data in G.nodes(data=True)], dtype=np.int32
+        ),
+        degrees=np.array([data["degree"] for _, data in G.nodes(data=True)]),
+        num_communities=len(G.graph["partition"]),
+        # The words of the Mersenne Twister state, generate_fs_graph never leaves a cached gauss value
+        random_state=np.array(random_state[1], dtype=np.uint32),
+    )
+    os.replace(tmp_path, path)
+
+
+def _read_graph(path: Path):
+    with np.load(path) as data:
+        communities = data["communities"].tolist()
+        G = nx.DiGraph()
+        G.add_nodes_from(
+            (u, {"community": community, "degree": degree})
+            for u, (community, degree) in enumerate(
+                zip(communities, data["degrees"].tolist())
+            )
+        )
+        # The edges were stored in the order of G.edges(), which keeps the order of the successors of every node
+        G.add_edges_from(zip(data["src"].tolist(), data["dst"].tolist()), weight=1)
+        partition = [set() for _ in range(int(data["num_communities"]))]
+        random_state = (3, tuple(data["random_state"].tolist()), None)
+    for u, community in enumerate(communities):
+        partition[community].add(u)
+    G.graph["partition"] = partition
+    return G, random_state
@@ -4,9 +4,17 @@ of the judicial citation network. The specific procedure and parameters utilized
 in Section 2 and 3 of our paper.
 """
 
+import json
+from pathlib import Path
 from random import choice, seed as randseed
+from typing import NamedTuple
 
 import networkx as nx
+import numpy as np
+from scipy import sparse
+
+from algorithm.csr import CSRGraph, partition_from_labels
+from utils.types import Partition
 
 AVG_DEGREE = 6.7
 DEGREE_ALPHA = 3.565
@@ -31,7 +39,13 @@ COMM_FRACTIONS = [
 
 INTER_COMMUNITY_FRAC = 0.282
 
-# DEG_FIT, COMM_FIT = power_law_fits(load_network())
+# Increase when a change to generate_fs_graph changes the graphs it generates, so cached graphs are generated again
+GENERATOR_VERSION = 1
+
+# Name of the file listing the shards written by write_fs_shards
+SHARD_MANIFEST = "manifest.json"
+
+# Degree exponent of the citation network, as printed by calculate_edge_probabilities.py
 DEG_ALPHA = 3.565129
 
 
@@ -85,5 +99,200 @@ def generate_fs_graph(n: int, seed=None) -> nx.DiGraph:
     return G
 
 
+class SyntheticGraph(NamedTuple):
+    """
+    A generated graph in array form: edge `i` goes from `src[i]` to `dst[i]`, and `communities[u]` is the ground-truth
+    community of node u. Nodes are numbered 0..len(communities)-1 and every edge has weight 1.
+    """
+
+    src: np.ndarray
+    dst: np.ndarray
+    communities: np.ndarray
+
+    def number_of_nodes(self) -> int:
+        return len(self.communities)
+
+    def number_of_edges(self) -> int:
+        return len(self.src)
+
+    def partition(self) -> Partition:
+        """
+        The ground-truth partition, without empty communities.
+        """
+        return partition_from_labels(self.communities)
+
+    def to_networkx(self) -> nx.DiGraph:
+        """
+        Build the graph `generate_fs_graph` would return: nodes with a `community` attribute, edges with weight 1, and
+        the ground-truth partition in `G.graph["partition"]`.
+        """
+        G = nx.DiGraph()
+        G.add_nodes_from(
+            (u, {"community": community})
+            for u, community in enumerate(self.communities.tolist())
+        )
+        G.add_edges_from(zip(self.src.tolist(), self.dst.tolist()), weight=1)
+        G.graph["partition"] = self.partition()
+        return G
+
+    def to_csr(self) -> CSRGraph:
+        n = self.number_of_nodes()
+        return CSRGraph.from_scipy(
+            sparse.coo_array(
+                (np.ones(len(self.src)), (self.src, self.dst)), shape=(n, n)
+            )
+        )
+
+
+def generate_fs_edges(n: int, seed=None) -> SyntheticGraph:
+    """
+    Vectorized version of `generate_fs_graph`, which draws the same kind of graph in bulk with NumPy and returns it as
+    arrays. Use `.to_networkx()` on the result to get a networkx graph.
+
+    All degrees and edge targets are drawn at once from a `numpy.random.Generator` created from `seed`, so the global
+    `random` state is not touched. Targets in other communities are drawn from the nodes outside the community
+    directly, instead of by rejection. Like adding an edge twice to a `nx.DiGraph`, duplicate edges are dropped.
+
+    The graphs follow the same degree and mixing distributions as `generate_fs_graph`, but are not the same graphs for
+    the same seed.
+    """
+    rng = np.random.default_rng(seed)
+    nodes_per_community = np.array([int(n * f) for f in COMM_FRACTIONS], dtype=np.int64)
+    num_nodes = int(nodes_per_community.sum())
+    communities = np.repeat(
+        np.arange(len(COMM_FRACTIONS), dtype=np.int32), nodes_per_community
+    )
+    # Same power law as nx.utils.powerlaw_sequence, which draws n degrees of which the first num_nodes are used
+    degrees = (rng.pareto(DEGREE_ALPHA - 1, n)[:num_nodes] + 1) * SCALING_FACTOR
+    src, dst = _draw_fs_edges(
+        rng,
+        np.arange(num_nodes, dtype=np.int64),
+        degrees,
+        communities,
+        nodes_per_community,
+    )
+    return SyntheticGraph(src=src, dst=dst, communities=communities)
+
+
+def write_fs_shards(n: int, directory, seed=None, chunk_size: int = 1_000_000) -> Path:
+    """
+    Streaming version of `generate_fs_edges` for graphs that do not fit in memory. The edges are generated
+    community by community, for at most `chunk_size` source nodes at a time, and every chunk is written to its own
+    `.npy` shard in `directory` as a (2, number of edges) array of sources and targets. Peak memory only depends on
+    `chunk_size`, not on n.
+
+    The shards are listed in `manifest.json`, which also holds the size of every community. The nodes of a community
+    are numbered consecutively, in the order of `COMM_FRACTIONS`, so this is all that is needed for the ground-truth
+    labels. Read the output back with `load_fs_shards`.
+
+    The graphs follow the same distributions as `generate_fs_edges`, but are not the same graphs for the same seed.
+    :return: Path of the manifest.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    nodes_per_community = np.array([int(n * f) for f in COMM_FRACTIONS], dtype=np.int64)
+    num_nodes = int(nodes_per_community.sum())
+    community_start = np.concatenate(([0], np.cumsum(nodes_per_community)[:-1]))
+    dtype = np.int32 if num_nodes <= np.iinfo(np.int32).max else np.int64
+    shards = []
+    for community, (start, size) in enumerate(
+        zip(community_start.tolist(), nodes_per_community.tolist())
+    ):
+        for first in range(start, start + size, chunk_size):
+            sources = np.arange(first, min(first + chunk_size, start + size))
+            degrees = (rng.pareto(DEGREE_ALPHA - 1, len(sources)) + 1) * SCALING_FACTOR
+            src, dst = _draw_fs_edges(
+                rng,
+                sources,
+                degrees,
+                np.full(len(sources), community),
+                nodes_per_community,
+            )
+            name = f"edges-{len(shards):05d}.npy"
+            np.save(directory / name, np.stack((src, dst)).astype(dtype))
+            shards.append({"file": name, "edges": len(src)})
+
+    manifest = {
+        "generator": "fs",
+        "n": n,
+        "seed": seed,
+        "number_of_nodes": num_nodes,
+        "number_of_edges": sum(shard["edges"] for shard in shards),
+        "community_sizes": nodes_per_community.tolist(),
+        "shards": shards,
+    }
+    manifest_path = directory / SHARD_MANIFEST
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
+def load_fs_shards(directory, mmap: bool = True) -> SyntheticGraph:
+    """
+    Load a graph written by `write_fs_shards`. With `mmap`, the shards are memory-mapped while they are concatenated,
+    so only the edge arrays of the result take up memory. Use `.to_csr()` on the result for Louvain and scoring.
+    """
+    directory = Path(directory)
+    with open(directory / SHARD_MANIFEST) as f:
+        manifest = json.load(f)
+    shards = [
+        np.load(directory / shard["file"], mmap_mode="r" if mmap else None)
+        for shard in manifest["shards"]
+    ]
+    communities = np.repeat(
+        np.arange(len(manifest["community_sizes"]), dtype=np.int32),
+        manifest["community_sizes"],
+    )
+    if not shards:
+        empty = np.empty(0, dtype=np.int64)
+        return SyntheticGraph(src=empty, dst=empty, communities=communities)
+    return SyntheticGraph(
+        src=np.concatenate([shard[0] for shard in shards]),
+        dst=np.concatenate([shard[1] for shard in shards]),
+        communities=communities,
+    )
+
+
+def _draw_fs_edges(
+    rng: np.random.Generator,
+    sources: np.ndarray,
+    degrees: np.ndarray,
+    source_communities: np.ndarray,
+    nodes_per_community: np.ndarray,
+):
+    """
+    Draw the edges of the given source nodes, as step 3 of `generate_fs_graph` does.
+    :return: Tuple (src, dst) of edge arrays, sorted by source and target and without duplicates.
+    """
+    num_nodes = int(nodes_per_community.sum())
+    community_start = np.concatenate(([0], np.cumsum(nodes_per_community)[:-1]))
+    # np.rint rounds halves to even, like round()
+    intra_degrees = np.rint(degrees * (1 - INTER_COMMUNITY_FRAC)).astype(np.int64)
+    inter_degrees = np.rint(degrees * INTER_COMMUNITY_FRAC).astype(np.int64)
+
+    # Edges to random nodes in the same community
+    intra_src = np.repeat(sources, intra_degrees)
+    intra_community = np.repeat(source_communities, intra_degrees)
+    intra_dst = community_start[intra_community] + rng.integers(
+        0, nodes_per_community[intra_community]
+    )
+    # Edges to random nodes in other communities: draw from the nodes outside the community, numbered as if the
+    # community was cut out of 0..num_nodes-1, and shift the ones after it
+    inter_src = np.repeat(sources, inter_degrees)
+    inter_community = np.repeat(source_communities, inter_degrees)
+    inter_dst = rng.integers(0, num_nodes - nodes_per_community[inter_community])
+    after = inter_dst >= community_start[inter_community]
+    inter_dst[after] += nodes_per_community[inter_community[after]]
+
+    # Sort the edges by source and target and drop the duplicates
+    edges = np.concatenate((intra_src, inter_src)) * num_nodes + np.concatenate(
+        (intra_dst, inter_dst)
+    )
+    edges.sort()
+    edges = edges[np.concatenate(([True], edges[1:] != edges[:-1]))]
+    return edges // num_nodes, edges % num_nodes
+
+
 if __name__ == "__main__":
     generate_fs_graph(1000)
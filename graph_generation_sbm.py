@@ -0,0 +1,141 @@
+"""
+Stochastic block model with the community sizes and edge probabilities measured on the judicial citation network, as
+written to `data/community_sizes.csv` and `data/edge_probabilities.csv` by `calculate_edge_probabilities.py`.
+
+Every ordered pair of distinct nodes in communities a and b gets an edge with the probability measured for (a, b).
+Instead of flipping a coin for each of the O(n²) pairs, the number of edges of every pair of communities is drawn from
+a binomial distribution and that many distinct node pairs are then drawn in bulk, which gives the same distribution in
+O(edges).
+
+The probabilities were measured on the whole citation network, so a graph with far fewer nodes gets very few edges.
+`generate_sbm_graph`, which the benchmarks use, therefore scales them to the average degree of the fs graphs.
+"""
+
+import csv
+import random
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+
+from graph_generation_fs import AVG_DEGREE, SyntheticGraph
+
+EDGE_PROBABILITIES_PATH = Path("data", "edge_probabilities.csv")
+COMMUNITY_SIZES_PATH = Path("data", "community_sizes.csv")
+
+
+def read_community_sizes(path: Path = COMMUNITY_SIZES_PATH) -> dict[str, float]:
+    """
+    :return: Dict from community name to the fraction of the nodes in that community, in the order of the file.
+    """
+    with open(path) as f:
+        return {community: float(fraction) for community, fraction in csv.reader(f)}
+
+
+def read_edge_probabilities(
+    path: Path = EDGE_PROBABILITIES_PATH,
+) -> dict[tuple[str, str], float]:
+    """
+    :return: Dict from (source community, target community) to the probability of an edge between two nodes of those
+        communities. Pairs that are not in the file have no edges.
+    """
+    with open(path) as f:
+        return {
+            (source, target): float(probability)
+            for source, target, probability in csv.reader(f)
+        }
+
+
+def generate_sbm_edges(
+    n: int,
+    seed=None,
+    community_sizes: dict[str, float] = None,
+    edge_probabilities: dict[tuple[str, str], float] = None,
+    avg_degree: float = None,
+) -> SyntheticGraph:
+    """
+    Generate a directed stochastic block model graph without self loops.
+    :param n: Number of nodes. Like `generate_fs_graph`, every community gets int(n * fraction) nodes, so the graph can
+        have slightly fewer nodes.
+    :param seed: Seed of the `numpy.random.Generator` used, the global `random` state is not touched.
+    :param community_sizes: Fraction of the nodes in every community, read with `read_community_sizes` by default.
+    :param edge_probabilities: Edge probability of every pair of communities, read with `read_edge_probabilities` by
+        default.
+    :param avg_degree: If given, all edge probabilities are multiplied by the same factor, so that the expected average
+        out-degree is `avg_degree`. Probabilities are capped at 1.
+    :return: The graph, with the communities numbered in the order of `community_sizes`. Use `.to_networkx()` to get a
+        graph like the one `generate_fs_graph` returns.
+    """
+    if community_sizes is None:
+        community_sizes = read_community_sizes()
+    if edge_probabilities is None:
+        edge_probabilities = read_edge_probabilities()
+    rng = np.random.default_rng(seed)
+    index = {community: i for i, community in enumerate(community_sizes)}
+    nodes_per_community = np.array(
+        [int(n * fraction) for fraction in community_sizes.values()], dtype=np.int64
+    )
+    num_nodes = int(nodes_per_community.sum())
+    community_start = np.concatenate(([0], np.cumsum(nodes_per_community)[:-1]))
+
+    # Number of ordered pairs of distinct nodes of every pair of communities
+    possible_pairs = {}
+    for source, target in edge_probabilities:
+        a, b = index[source], index[target]
+        size_a, size_b = int(nodes_per_community[a]), int(nodes_per_community[b])
+        possible_pairs[source, target] = (
+            size_a * (size_b - 1) if a == b else size_a * size_b
+        )
+    scale = 1.0
+    if avg_degree is not None:
+        expected_edges = sum(
+            possible_pairs[pair] * probability
+            for pair, probability in edge_probabilities.items()
+        )
+        if expected_edges > 0:
+            scale = avg_degree * num_nodes / expected_edges
+
+    src = []
+    dst = []
+    for (source, target), probability in edge_probabilities.items():
+        a, b = index[source], index[target]
+        size_b = int(nodes_per_community[b])
+        # Every ordered pair of distinct nodes, numbered row by row
+        possible = possible_pairs[source, target]
+        probability = min(1.0, probability * scale)
+        num_edges = rng.binomial(possible, probability) if possible > 0 else 0
+        pairs = rng.choice(possible, size=num_edges, replace=False)
+        if a == b:
+            # Row u has no entry for u itself, so targets from u onwards move up by one
+            u, v = np.divmod(pairs, size_b - 1)
+            v += v >= u
+        else:
+            u, v = np.divmod(pairs, size_b)
+        src.append(community_start[a] + u)
+        dst.append(community_start[b] + v)
+
+    edges = np.sort(
+        np.concatenate(src, dtype=np.int64) * num_nodes
+        + np.concatenate(dst, dtype=np.int64)
+    )
+    return SyntheticGraph(
+        src=edges // num_nodes,
+        dst=edges % num_nodes,
+        communities=np.repeat(
+            np.arange(len(nodes_per_community), dtype=np.int32), nodes_per_community
+        ),
+    )
+
+
+def generate_sbm_graph(n: int, seed=None, avg_degree: float = AVG_DEGREE) -> nx.DiGraph:
+    """
+    Generate the stochastic block model graph the benchmarks use, like `generate_fs_graph` does for the fs graphs.
+    :param n: Number of nodes, see `generate_sbm_edges`.
+    :param seed: Seed of the graph. Like `generate_fs_graph`, the global `random` state is seeded with it as well, so
+        Louvain shuffles the nodes the same way on every run.
+    :param avg_degree: Expected average out-degree, the same as that of the fs graphs by default.
+    :return: The graph, with the ground-truth partition in `G.graph["partition"]`.
+    """
+    if seed is not None:
+        random.seed(seed)
+    return generate_sbm_edges(n, seed=seed, avg_degree=avg_degree).to_networkx()
@@ -1,12 +1,12 @@
 import networkx as nx
-import csv
 from pathlib import Path
 
 from assess import run_benchmarks
+from network_cache import NETWORK_CACHE_DIR, CitationNetwork, cached_network
+from network_ingest import ingest_network
 
 EDGE_CSV_PATH = Path("data", "citations.csv")
 METADATA_CSV_PATH = Path("data", "case_metadata.csv")
-NETWORK_CACHE_PATH = Path("data", "network_cache.pik")
 
 
 def load_network(
@@ -14,23 +14,32 @@ def load_network(
     metadata_csv: Path = METADATA_CSV_PATH,
     edge_csv: Path = EDGE_CSV_PATH,
 ) -> nx.Graph:
-    # We can get a performance bump on subsequent runs by storing the graph as a pickle
-    if NETWORK_CACHE_PATH.exists():
-        return nx.read_gpickle(NETWORK_CACHE_PATH)
-    base_graph = nx.DiGraph() if directed else nx.Graph()
-    g = nx.read_edgelist(
-        edge_csv,
-        delimiter=",",
-        create_using=base_graph,
+    return open_network(metadata_csv, edge_csv).to_networkx(directed)
+
+
+def open_network(
+    metadata_csv: Path = METADATA_CSV_PATH,
+    edge_csv: Path = EDGE_CSV_PATH,
+    cache_dir: Path = NETWORK_CACHE_DIR,
+) -> CitationNetwork:
+    """
+    Open the citation network as memory-mapped arrays, see `network_cache.py`. The CSV files are only read if they
+    changed since the network was last cached.
+    """
+    return cached_network(
+        (edge_csv, metadata_csv),
+        lambda: read_network(metadata_csv, edge_csv),
+        cache_dir,
     )
-    with open(metadata_csv, "r") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            # Check if row[0] is a node
-            if row[0] in g.nodes:
-                g.nodes[row[0]]["court"] = row[1]
-    nx.write_gpickle(g, NETWORK_CACHE_PATH)
-    return g
+
+
+def read_network(
+    metadata_csv: Path = METADATA_CSV_PATH, edge_csv: Path = EDGE_CSV_PATH
+) -> CitationNetwork:
+    """
+    Read the citation network from the CSV files, without caching it. See `network_ingest.py`.
+    """
+    return ingest_network(edge_csv, metadata_csv)
 
 
 def main():
@@ -0,0 +1,174 @@
+"""
+On-disk cache of the citation network as plain arrays, so `load_network` only parses the CSV files once.
+
+Every cached network is a directory of `.npy` files: the case id of every node, the out-adjacency in CSR form and the
+court of every node. They are opened memory-mapped, which makes reopening the network nearly instant and lets several
+processes share the same pages. The directory name is a hash of the size, modification time and a sample of the
+contents of the source CSV files and of `NETWORK_CACHE_FORMAT`, so the cache is rebuilt whenever one of them changes.
+The networks of every set of source files are kept in a subdirectory named after a hash of their paths, so networks
+of different datasets can be cached side by side.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import networkx as nx
+import numpy as np
+
+from algorithm.csr import CSRGraph
+
+NETWORK_CACHE_DIR = Path("data", "network_cache")
+
+# Increase when the contents of the cache directories change
+NETWORK_CACHE_FORMAT = 1
+
+# Bytes read from the start and the end of every source file for the cache key
+KEY_SAMPLE_BYTES = 1024 * 1024
+
+# Court of nodes without a row in the metadata
+NO_COURT = -1
+
+
+class CitationNetwork(NamedTuple):
+    """
+    Directed citation network on the nodes 0..n-1. `nodes[u]` is the case id of u, and
+    `indices[indptr[u]:indptr[u + 1]]` are the cases u cites, in the order of the edge list. `court_names[courts[u]]`
+    is the court of u, or `courts[u]` is `NO_COURT` if u has no metadata.
+    """
+
+    nodes: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    courts: np.ndarray
+    court_names: np.ndarray
+
+    def number_of_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+    def number_of_edges(self) -> int:
+        return len(self.indices)
+
+    def edge_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Source and target of every edge, ordered by source.
+        """
+        src = np.repeat(
+            np.arange(self.number_of_nodes(), dtype=np.int32), np.diff(self.indptr)
+        )
+        return src, np.asarray(self.indices)
+
+    def to_csr(self) -> CSRGraph:
+        """
+        The network as a `CSRGraph` with weight 1 on every edge, labelled with the case ids.
+        """
+        src, dst = self.edge_arrays()
+        return CSRGraph.from_edges(
+            src,
+            dst,
+            np.ones(len(dst)),
+            self.number_of_nodes(),
+            nodes=self.nodes.tolist(),
+        )
+
+    def to_networkx(self, directed: bool = True) -> nx.Graph:
+        """
+        Build the graph `nx.read_edgelist` gives for the edge list, with a `court` attribute on every node that has
+        metadata. Nodes are added in the order of the edge list, and edges grouped by source. That is also the order
+        `nx.read_edgelist` gives a directed graph, an undirected graph has the same edges in a different order.
+        """
+        G = nx.DiGraph() if directed else nx.Graph()
+        nodes = self.nodes.tolist()
+        court_names = self.court_names.tolist()
+        G.add_nodes_from(
+            (u, {"court": court_names[court]}) if court != NO_COURT else (u, {})
+            for u, court in zip(nodes, self.courts.tolist())
+        )
+        src, dst = self.edge_arrays()
+        G.add_edges_from(
+            zip(
+                (nodes[u] for u in src.tolist()),
+                (nodes[v] for v in dst.tolist()),
+            )
+        )
+        return G
+
+
+def network_key(*source_files: Path) -> str:
+    """
+    Key of the network built from the given source files in their current state.
+    """
+    key = hashlib.sha256(f"format {NETWORK_CACHE_FORMAT}\n".encode())
+    for path in source_files:
+        stat = os.stat(path)
+        key.update(f"{Path(path).name} {stat.st_size} {stat.st_mtime_ns}\n".encode())
+        # A sample of the contents, in case a file was replaced by one of the same size and modification time
+        with open(path, "rb") as f:
+            key.update(f.read(KEY_SAMPLE_BYTES))
+            if stat.st_size > 2 * KEY_SAMPLE_BYTES:
+                f.seek(-KEY_SAMPLE_BYTES, os.SEEK_END)
+            key.update(f.read(KEY_SAMPLE_BYTES))
+    return key.hexdigest()
+
+
+def source_key(*source_files: Path) -> str:
+    """
+    Key of the paths of the source files, whatever their contents.
+    """
+    key = hashlib.sha256()
+    for path in source_files:
+        key.update(f"{Path(path).resolve()}\n".encode())
+    return key.hexdigest()
+
+
+def cached_network(
+    source_files: tuple,
+    build: Callable[[], CitationNetwork],
+    cache_dir: Path = NETWORK_CACHE_DIR,
+) -> CitationNetwork:
+    """
+    Open the cached network built from `source_files`, or build it with `build` and cache it if there is none. Cached
+    networks of older versions of the same source files are removed, those of other source files are kept.
+    """
+    source_dir = Path(cache_dir, source_key(*source_files))
+    path = source_dir / network_key(*source_files)
+    if not path.exists():
+        _write_network(build(), path)
+        for stale in source_dir.iterdir():
+            if stale.is_dir() and stale != path and not stale.name.endswith(".tmp"):
+                shutil.rmtree(stale, ignore_errors=True)
+    return _read_network(path)
+
+
+def _write_network(network: CitationNetwork, path: Path):
+    # Write to a temporary directory first, so a reader never sees a partially written network
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    for field, array in network._asdict().items():
+        np.save(tmp_path / f"{field}.npy", array)
+    with open(tmp_path / "info.json", "w") as f:
+        json.dump(
+            {
+                "format": NETWORK_CACHE_FORMAT,
+                "nodes": network.number_of_nodes(),
+                "edges": network.number_of_edges(),
+            },
+            f,
+        )
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another process wrote the same network first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _read_network(path: Path) -> CitationNetwork:
+    return CitationNetwork(
+        **{
+            field: np.load(path / f"{field}.npy", mmap_mode="r")
+            for field in CitationNetwork._fields
+        }
+    )
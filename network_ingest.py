@@ -0,0 +1,162 @@
+"""
+Streaming ingest of the citation network CSV files into the arrays of a `CitationNetwork`, without building a networkx
+graph.
+
+The edge list is read in chunks of raw bytes. Every case id is interned to an int32 node id the first time it is seen,
+in the same order as `nx.read_edgelist` adds the nodes, and the edges of each chunk are stored as two int32 arrays. At
+the end, duplicate edges are dropped and the edges are grouped by source into CSR form. The metadata is then streamed
+to fill in the court of every node.
+"""
+
+import csv
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from network_cache import NO_COURT, CitationNetwork
+
+# Memory the parse buffers may use by default
+INGEST_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Bytes of Python objects per byte of CSV while a chunk is parsed, as measured on the citation data
+PARSE_OVERHEAD = 8
+
+MIN_CHUNK_BYTES = 64 * 1024
+
+# Seconds between progress reports
+REPORT_INTERVAL = 5
+
+
+def ingest_network(
+    edge_csv: Path,
+    metadata_csv: Path,
+    memory_budget: int = INGEST_MEMORY_BUDGET,
+    report: Callable[[str], None] = print,
+) -> CitationNetwork:
+    """
+    Read the citation network from its CSV files.
+    :param edge_csv: Edge list with one `citing,cited` pair of case ids per line, read like `nx.read_edgelist` does.
+        Text after a `#` is ignored, as are lines with fewer than two fields.
+    :param metadata_csv: CSV file with the case id and court of each case. Rows of cases that are not in the edge list
+        are skipped, and a later row of the same case overrides an earlier one.
+    :param memory_budget: Bytes the parse buffers may use, which determines the size of the chunks that are read. The
+        node table and the edge arrays that are built are not included.
+    :param report: Called with progress messages, including the number of rows read per second.
+    :return: The network, with the nodes in order of first appearance and the successors of every node in the order of
+        the edge list.
+    """
+    chunk_bytes = max(MIN_CHUNK_BYTES, memory_budget // PARSE_OVERHEAD)
+    node_index = {}
+    # Start with an empty chunk, so an edge list without edges gives an empty network
+    src_chunks = [np.empty(0, dtype=np.int32)]
+    dst_chunks = [np.empty(0, dtype=np.int32)]
+    progress = _Progress(f"edges from {edge_csv}", report)
+    for lines in _read_chunks(edge_csv, chunk_bytes):
+        src = []
+        dst = []
+        for line in lines:
+            fields = line.split(b"#", 1)[0].strip().split(b",")
+            if len(fields) < 2:
+                continue
+            src.append(node_index.setdefault(fields[0], len(node_index)))
+            dst.append(node_index.setdefault(fields[1], len(node_index)))
+        src_chunks.append(np.array(src, dtype=np.int32))
+        dst_chunks.append(np.array(dst, dtype=np.int32))
+        progress.update(len(src))
+    progress.done()
+
+    n = len(node_index)
+    indptr, indices = _csr(
+        np.concatenate(src_chunks, dtype=np.int32),
+        np.concatenate(dst_chunks, dtype=np.int32),
+        n,
+    )
+    del src_chunks, dst_chunks
+
+    courts = np.full(n, NO_COURT, dtype=np.int32)
+    court_index = {}
+    progress = _Progress(f"cases from {metadata_csv}", report)
+    with open(metadata_csv, "r", newline="") as f:
+        rows = 0
+        for row in csv.reader(f):
+            node = node_index.get(row[0].encode())
+            if node is not None:
+                courts[node] = court_index.setdefault(row[1], len(court_index))
+            rows += 1
+            if rows == 100_000:
+                progress.update(rows)
+                rows = 0
+        progress.update(rows)
+    progress.done()
+
+    return CitationNetwork(
+        nodes=np.array([node.decode() for node in node_index], dtype=str),
+        indptr=indptr,
+        indices=indices,
+        courts=courts,
+        court_names=np.array(list(court_index), dtype=str),
+    )
+
+
+def _read_chunks(path: Path, chunk_bytes: int):
+    """
+    Yield the lines of a file in lists that together hold about `chunk_bytes` bytes.
+    """
+    with open(path, "rb") as f:
+        rest = b""
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                break
+            lines = (rest + chunk).split(b"\n")
+            # The last line may continue in the next chunk
+            rest = lines.pop()
+            yield lines
+        if rest:
+            yield [rest]
+
+
+def _csr(src: np.ndarray, dst: np.ndarray, n: int):
+    """
+    Drop repeated edges, keeping the first one like a networkx DiGraph does, and group the edges by source.
+    """
+    keys = src.astype(np.int64) * n + dst
+    order = np.argsort(keys, kind="stable")
+    first = np.ones(len(keys), dtype=bool)
+    first[order[1:]] = keys[order[1:]] != keys[order[:-1]]
+    src = src[first]
+    dst = dst[first]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[np.argsort(src, kind="stable")]
+
+
+class _Progress:
+    """
+    Counts the rows that have been read, and reports the rate every `REPORT_INTERVAL` seconds and at the end.
+    """
+
+    def __init__(self, what: str, report: Callable[[str], None]):
+        self.what = what
+        self.report = report
+        self.rows = 0
+        self.start = self.last_report = time.perf_counter()
+
+    def update(self, rows: int):
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self.last_report >= REPORT_INTERVAL:
+            self.last_report = now
+            self._report(now, "Reading")
+
+    def done(self):
+        self._report(time.perf_counter(), "Read")
+
+    def _report(self, now: float, verb: str):
+        seconds = now - self.start
+        rate = self.rows / seconds if seconds > 0 else float("inf")
+        self.report(
+            f"{verb} {self.rows} {self.what} in {seconds:.1f}s ({rate:.0f} rows/s)"
+        )
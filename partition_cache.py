@@ -0,0 +1,140 @@
+"""
+Persistent cache of Louvain partitions, so changes to the reporting in `assess.py` do not require running Louvain
+again on every graph.
+
+A partition is stored as a label array in a `.npy` file whose name is a hash of everything that determines it: the
+graph, the global and local measure, the Louvain options, the state of the global `random` module that Louvain
+shuffles the nodes with, and the source code in `algorithm/`. The cache directory is kept under a size limit by
+removing the least recently used partitions.
+"""
+
+import hashlib
+import os
+import random
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+
+import networkx as nx
+import numpy as np
+
+from algorithm.csr import CSRGraph
+from algorithm.louvain import louvain_communities
+from utils.partition import LabelPartition
+
+PARTITION_CACHE_DIR = Path("data", "partition_cache")
+
+# Size limit of the cache directory
+PARTITION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+ALGORITHM_DIR = Path(__file__).parent / "algorithm"
+
+
+def cached_louvain_communities(
+    G: nx.DiGraph,
+    global_community_measure: Callable,
+    local_community_measure: Callable,
+    cache_dir: Path = PARTITION_CACHE_DIR,
+    max_bytes: int = PARTITION_CACHE_MAX_BYTES,
+    **louvain_options,
+) -> LabelPartition:
+    """
+    Cached version of `louvain_communities`, which takes the same arguments. The partition is only computed if the
+    cache has no partition for the same graph, measures, options and `random` state.
+
+    Unlike `louvain_communities`, a cache hit does not advance the global `random` state. Calls with an `observer` are
+    not cached, as the observer would not be called on a hit.
+    """
+    if louvain_options.get("observer") is not None:
+        return louvain_communities(
+            G, global_community_measure, local_community_measure, **louvain_options
+        )
+    nodes = list(G.nodes())
+    path = Path(
+        cache_dir,
+        partition_key(
+            G, global_community_measure, local_community_measure, louvain_options
+        )
+        + ".npy",
+    )
+    if path.exists():
+        # Mark the partition as recently used
+        os.utime(path)
+        return LabelPartition(np.load(path), nodes)
+
+    partition = louvain_communities(
+        G, global_community_measure, local_community_measure, **louvain_options
+    )
+    labels = LabelPartition.from_sets(partition, nodes).labels
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first, so a reader never sees a partially written partition
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp_path, labels)
+    os.replace(tmp_path, path)
+    evict_partitions(cache_dir, max_bytes)
+    return partition
+
+
+def partition_key(
+    G: nx.DiGraph,
+    global_community_measure: Callable,
+    local_community_measure: Callable,
+    louvain_options: dict,
+) -> str:
+    """
+    Hash of everything that determines the partition `louvain_communities` finds.
+    """
+    key = hashlib.sha256()
+    key.update(graph_hash(G).encode())
+    for measure in (global_community_measure, local_community_measure):
+        key.update(f"{measure.__module__}.{measure.__qualname__}\n".encode())
+    key.update(repr(sorted(louvain_options.items())).encode())
+    key.update(repr(random.getstate()).encode())
+    key.update(_algorithm_source_hash().encode())
+    return key.hexdigest()
+
+
+def graph_hash(G: nx.DiGraph) -> str:
+    """
+    Hash of the nodes, the edges and their weights, and the order of the nodes and of the successors of every node,
+    which determines the order in which Louvain visits them.
+    """
+    graph = CSRGraph.from_networkx(G)
+    key = hashlib.sha256()
+    key.update(repr(graph.nodes).encode())
+    key.update(str(G.is_directed()).encode())
+    for array in (graph.out_indptr, graph.out_indices, graph.out_weights):
+        key.update(array.tobytes())
+    return key.hexdigest()
+
+
+def evict_partitions(cache_dir: Path, max_bytes: int):
+    """
+    Remove the least recently used partitions until the cache directory is at most `max_bytes` in size.
+    """
+    files = []
+    for path in Path(cache_dir).glob("*.npy"):
+        if path.name.endswith(".tmp.npy"):
+            # Partition another process is still writing, it is renamed into place right after
+            continue
+        try:
+            files.append((path.stat(), path))
+        except FileNotFoundError:
+            # Removed by another process in the meantime
+            continue
+    total = sum(stat.st_size for stat, _ in files)
+    for stat, path in sorted(files, key=lambda file: file[0].st_mtime):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= stat.st_size
+
+
+@lru_cache(maxsize=None)
+def _algorithm_source_hash() -> str:
+    # Any change to Louvain or a measure may change the partitions
+    key = hashlib.sha256()
+    for path in sorted(ALGORITHM_DIR.glob("*.py")):
+        key.update(path.name.encode())
+        key.update(path.read_bytes())
+    return key.hexdigest()
@@ -0,0 +1,315 @@
+"""
+Performance benchmarks: how the runtime and memory use of Louvain with each community measure, the synthetic graph
+generator, graph aggregation and network loading scale with the size of the graph.
+
+Every case runs in a fresh process, so its peak resident set size is its own. The results are written to a JSON file
+together with the commit and environment they were measured on, and compared with a stored baseline to flag
+regressions. Everything runs offline.
+
+Run `python perf_benchmarks.py --help` for the options.
+"""
+
+import json
+import platform
+import subprocess
+import sys
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+import click
+import networkx as nx
+import numpy as np
+
+from algorithm.csr import CSRGraph, labels_from_partition
+from algorithm.instrumentation import LevelStatsCollector, peak_memory
+from algorithm.louvain import ENGINES, _gen_graph, _gen_graph_csr
+from assess import COMMUNITY_MEASURES
+from graph_cache import cached_fs_graph
+from graph_generation_fs import generate_fs_graph
+from load_network import EDGE_CSV_PATH, load_network
+
+# Increase when the format of the results file changes
+PERF_RESULTS_VERSION = 1
+
+PERF_RESULTS_FILE = Path("data", "perf_results.json")
+PERF_BASELINE_FILE = Path("data", "perf_baseline.json")
+
+GRAPH_SIZES = (1_000, 3_000, 10_000, 30_000, 100_000)
+
+PERF_SEED = 2022_0
+
+# Differences in runtime below this many seconds are never flagged, as they are mostly noise
+MIN_SECONDS = 0.05
+
+
+def _generate_fs_graph_case(n: int, engine: str) -> dict:
+    start = time.perf_counter()
+    generate_fs_graph(n, seed=PERF_SEED)
+    return {"seconds": time.perf_counter() - start}
+
+
+def _gen_graph_case(n: int, engine: str) -> dict:
+    # Aggregate the graph by its ground-truth communities, as Louvain does after its first level
+    G = cached_fs_graph(n, PERF_SEED)
+    partition = G.graph["partition"]
+    if engine == "csr":
+        graph = CSRGraph.from_networkx(G)
+        labels = labels_from_partition(partition, graph.number_of_nodes())
+        start = time.perf_counter()
+        _gen_graph_csr(graph, labels)
+    else:
+        graph = nx.DiGraph()
+        graph.add_nodes_from(G)
+        graph.add_weighted_edges_from(G.edges(data="weight"))
+        start = time.perf_counter()
+        _gen_graph(graph, partition)
+    return {"seconds": time.perf_counter() - start}
+
+
+def _louvain_case(measure: str):
+    def louvain_case(n: int, engine: str) -> dict:
+        G = cached_fs_graph(n, PERF_SEED)
+        # An observer also makes sure the partition cache is bypassed
+        level_stats = LevelStatsCollector()
+        start = time.perf_counter()
+        COMMUNITY_MEASURES[measure]["partition_func"](
+            G, engine=engine, observer=level_stats
+        )
+        return {
+            "seconds": time.perf_counter() - start,
+            "levels": len(level_stats.rows),
+            "evaluations": sum(row["evaluations"] for row in level_stats.rows),
+        }
+
+    return louvain_case
+
+
+def _load_network_case(n: int, engine: str) -> dict:
+    start = time.perf_counter()
+    G = load_network()
+    return {
+        "seconds": time.perf_counter() - start,
+        "nodes": G.number_of_nodes(),
+        "edges": G.number_of_edges(),
+    }
+
+
+# Every case gets the graph size and the Louvain engine, and returns the seconds its timed part took and other counts
+CASES = {
+    "generate_fs_graph": _generate_fs_graph_case,
+    "gen_graph": _gen_graph_case,
+    **{f"louvain_{measure}": _louvain_case(measure) for measure in COMMUNITY_MEASURES},
+}
+
+# Cases that do not depend on the graph size, and only run once
+FIXED_SIZE_CASES = {"load_network": _load_network_case}
+
+
+def run_perf_benchmarks(
+    sizes=GRAPH_SIZES,
+    cases=tuple(CASES) + tuple(FIXED_SIZE_CASES),
+    engine: str = "csr",
+    max_seconds: float = 600,
+) -> dict:
+    """
+    Run every case on every graph size, each in a fresh process.
+    :param sizes: Graph sizes to run the cases on.
+    :param cases: Names of the cases in CASES or FIXED_SIZE_CASES.
+    :param engine: Louvain engine used by the Louvain and aggregation cases.
+    :param max_seconds: Larger sizes of a case are skipped once it takes longer than this.
+    :return: The results, in the format of the results file.
+    """
+    results = []
+    for case in cases:
+        if case in FIXED_SIZE_CASES:
+            if case == "load_network" and not EDGE_CSV_PATH.exists():
+                print(f"Skipping {case}, {EDGE_CSV_PATH} does not exist")
+                continue
+            case_sizes = (None,)
+        else:
+            case_sizes = sizes
+        for n in case_sizes:
+            print(f"Running {case} on {n} nodes...")
+            result = {"case": case, "size": n, **_run_in_process(case, n, engine)}
+            print(f"{case}: {result}")
+            results.append(result)
+            if result["seconds"] > max_seconds:
+                print(f"Skipping larger sizes of {case}, it took over {max_seconds}s")
+                break
+    return {
+        "version": PERF_RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "engine": engine,
+        "environment": {
+            "python": platform.python_version(),
+            "networkx": nx.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+
+def find_regressions(
+    results: dict,
+    baseline: dict,
+    time_tolerance: float = 0.25,
+    memory_tolerance: float = 0.25,
+) -> list[str]:
+    """
+    Compare results with a baseline of the same format, measured with the same engine.
+    :param time_tolerance: Fraction by which a case may get slower before it is flagged.
+    :param memory_tolerance: Fraction by which the peak resident set size of a case may grow before it is flagged.
+    :return: A description of every regression.
+    """
+    if baseline["version"] != results["version"]:
+        raise ValueError(
+            f"Baseline has version {baseline['version']}, expected {results['version']}"
+        )
+    if baseline["engine"] != results["engine"]:
+        # The engines differ in runtime, memory and number of evaluations, so nothing could be compared
+        raise ValueError(
+            f"Baseline was measured with the {baseline['engine']} engine, the results with the"
+            f" {results['engine']} engine"
+        )
+    baseline_results = {
+        (result["case"], result["size"]): result for result in baseline["results"]
+    }
+    regressions = []
+    for result in results["results"]:
+        base = baseline_results.get((result["case"], result["size"]))
+        if base is None:
+            continue
+        name = f"{result['case']} on {result['size']} nodes"
+        if (
+            result["seconds"] > base["seconds"] * (1 + time_tolerance)
+            and result["seconds"] - base["seconds"] > MIN_SECONDS
+        ):
+            regressions.append(
+                f"{name} took {result['seconds']:.3f}s, baseline {base['seconds']:.3f}s"
+            )
+        if result["peak_rss"] > base["peak_rss"] * (1 + memory_tolerance):
+            regressions.append(
+                f"{name} used {result['peak_rss'] / 2**20:.1f} MiB,"
+                f" baseline {base['peak_rss'] / 2**20:.1f} MiB"
+            )
+        if "evaluations" in base and result["evaluations"] != base["evaluations"]:
+            # Not a regression by itself, but a sign that the algorithm behaves differently
+            print(
+                f"{name} evaluated the local measure {result['evaluations']} times,"
+                f" baseline {base['evaluations']}"
+            )
+    return regressions
+
+
+def _run_in_process(case: str, n: int, engine: str) -> dict:
+    with get_context("spawn").Pool(1) as pool:
+        return pool.apply(_run_case, (case, n, engine))
+
+
+def _run_case(case: str, n: int, engine: str) -> dict:
+    result = {**CASES, **FIXED_SIZE_CASES}[case](n, engine)
+    result["peak_rss"] = peak_memory().get("peak_rss")
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@click.command()
+@click.option(
+    "--sizes",
+    default=",".join(map(str, GRAPH_SIZES)),
+    show_default=True,
+    help="Comma-separated graph sizes.",
+)
+@click.option(
+    "--cases",
+    default=",".join((*CASES, *FIXED_SIZE_CASES)),
+    show_default=True,
+    help="Comma-separated cases to run.",
+)
+@click.option("--engine", type=click.Choice(ENGINES), default="csr", show_default=True)
+@click.option(
+    "--max-seconds",
+    default=600.0,
+    show_default=True,
+    help="Skip larger sizes of a case once it takes longer than this.",
+)
+@click.option(
+    "--output",
+    type=click.Path(path_type=Path),
+    default=PERF_RESULTS_FILE,
+    show_default=True,
+)
+@click.option(
+    "--baseline",
+    type=click.Path(path_type=Path),
+    default=PERF_BASELINE_FILE,
+    show_default=True,
+)
+@click.option(
+    "--save-baseline", is_flag=True, help="Store the results as the new baseline."
+)
+@click.option(
+    "--tolerance",
+    default=0.25,
+    show_default=True,
+    help="Fraction by which time and memory may grow before a case is flagged.",
+)
+def main(sizes, cases, engine, max_seconds, output, baseline, save_baseline, tolerance):
+    """
+    Run the performance benchmarks and compare them with the baseline. Exits with status 1 if there are regressions.
+    """
+    results = run_perf_benchmarks(
+        sizes=[int(size) for size in sizes.split(",")],
+        cases=cases.split(","),
+        engine=engine,
+        max_seconds=max_seconds,
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    if save_baseline:
+        with open(baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {baseline}")
+        return
+    if not baseline.exists():
+        print(f"No baseline at {baseline}, run with --save-baseline to store one")
+        return
+    with open(baseline) as f:
+        try:
+            regressions = find_regressions(
+                results,
+                json.load(f),
+                time_tolerance=tolerance,
+                memory_tolerance=tolerance,
+            )
+        except ValueError as e:
+            raise click.ClickException(
+                f"{e}. Run with --save-baseline to store a new baseline."
+            )
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
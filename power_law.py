@@ -0,0 +1,188 @@
+"""
+Fit of a discrete power law P(x) ~ x^-alpha for x >= xmin to a sample of positive integers, such as a degree
+sequence, following Clauset, Shalizi and Newman (2009).
+
+Every distinct value of the sample is a candidate xmin. The maximum likelihood estimate of alpha of all candidates is
+found at once, from suffix sums over the sorted distinct values, and every candidate is scored by the
+Kolmogorov-Smirnov distance between the sample above it and the fitted power law. The candidate with the smallest
+distance is chosen. Fits are cached on disk by a hash of the sample.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+from scipy.special import zeta
+
+POWER_LAW_CACHE_DIR = Path("data", "powerlaw_fits")
+
+# Increase when the estimator changes, so cached fits are not used anymore
+ESTIMATOR_VERSION = 1
+
+# Maximum number of entries of the candidate x value matrices that are scored at once
+KS_BLOCK_SIZE = 2**22
+
+# Candidate xmin with fewer values from it on are not considered, as their estimates are mostly noise
+MIN_TAIL = 50
+
+# Smallest x for which zeta(a, x) is computed from its expansion, increased by 2a
+ZETA_EXPANSION_MIN = 30
+
+# Range of alpha the estimate is searched in, and how precisely
+ALPHA_BOUNDS = (1.0001, 20.0)
+ALPHA_TOLERANCE = 1e-9
+
+
+class PowerLawFit(NamedTuple):
+    alpha: float
+    xmin: int
+    # Kolmogorov-Smirnov distance between the sample from xmin on and the fitted power law
+    ks_distance: float
+    # Number of values in the sample that are at least xmin
+    n_tail: int
+
+
+def fit_power_law(
+    data, min_tail: int = MIN_TAIL, cache_dir: Path = POWER_LAW_CACHE_DIR
+) -> PowerLawFit:
+    """
+    Fit a discrete power law to a sample of positive integers.
+    :param data: The sample. Values below 1 are ignored.
+    :param min_tail: Minimum number of values from a candidate xmin on. The smallest value is always a candidate.
+    :param cache_dir: Directory the fit is cached in, or None to not cache it.
+    """
+    data = np.sort(np.asarray(data, dtype=np.int64))
+    data = data[data >= 1]
+    if cache_dir is None:
+        return _fit(data, min_tail)
+    key = hashlib.sha256(f"version {ESTIMATOR_VERSION} {min_tail}\n".encode())
+    key.update(data.tobytes())
+    path = Path(cache_dir, f"{key.hexdigest()}.json")
+    if path.exists():
+        with open(path) as f:
+            return PowerLawFit(**json.load(f))
+    fit = _fit(data, min_tail)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first, so a reader never sees a partially written fit
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(fit._asdict(), f)
+    os.replace(tmp_path, path)
+    return fit
+
+
+def _fit(data: np.ndarray, min_tail: int) -> PowerLawFit:
+    """
+    Fit a power law to a sorted sample of positive integers.
+    """
+    # Distinct values and how often they occur
+    starts = np.flatnonzero(np.diff(data, prepend=0))
+    values = data[starts]
+    counts = np.diff(starts, append=len(data))
+    if len(values) < 2:
+        raise ValueError("A power law needs a sample with at least two distinct values")
+
+    # Number of values and sum of their logarithms from every distinct value on
+    tail_n = np.cumsum(counts[::-1])[::-1]
+    tail_log = np.cumsum((counts * np.log(values))[::-1])[::-1]
+    # The largest value is not a candidate, as a single value has no alpha
+    candidates = np.arange(len(values) - 1)
+    candidates = candidates[(tail_n[candidates] >= min_tail) | (candidates == 0)]
+    alpha = _discrete_mle(values[candidates], tail_n[candidates], tail_log[candidates])
+    ks_distance = np.empty(len(candidates))
+    block = max(1, KS_BLOCK_SIZE // len(values))
+    for start in range(0, len(candidates), block):
+        rows = slice(start, start + block)
+        ks_distance[rows] = _ks_distances(values, tail_n, candidates[rows], alpha[rows])
+
+    best = int(np.argmin(ks_distance))
+    return PowerLawFit(
+        alpha=float(alpha[best]),
+        xmin=int(values[candidates[best]]),
+        ks_distance=float(ks_distance[best]),
+        n_tail=int(tail_n[candidates[best]]),
+    )
+
+
+def _discrete_mle(xmin: np.ndarray, n: np.ndarray, log_sum: np.ndarray) -> np.ndarray:
+    """
+    Maximum likelihood estimate of alpha for every candidate xmin, given the number of values from xmin on and the sum
+    of their logarithms. The negative log-likelihood n log zeta(alpha, xmin) + alpha sum(log x) is convex in alpha, so
+    a golden-section search on all candidates at once finds its minimum.
+    """
+    xmin = xmin.astype(np.float64)
+
+    def loss(a):
+        return n * np.log(zeta(a, xmin)) + a * log_sum
+
+    ratio = (np.sqrt(5) - 1) / 2
+    low = np.full(len(xmin), ALPHA_BOUNDS[0])
+    high = np.full(len(xmin), ALPHA_BOUNDS[1])
+    left = high - ratio * (high - low)
+    right = low + ratio * (high - low)
+    loss_left = loss(left)
+    loss_right = loss(right)
+    while (high - low).max(initial=0) > ALPHA_TOLERANCE:
+        # Keep the part of the interval around the smaller of the two inner points
+        go_left = loss_left < loss_right
+        high = np.where(go_left, right, high)
+        low = np.where(go_left, low, left)
+        left, right = (
+            np.where(go_left, high - ratio * (high - low), right),
+            np.where(go_left, left, low + ratio * (high - low)),
+        )
+        loss_left, loss_right = (
+            np.where(go_left, loss(left), loss_right),
+            np.where(go_left, loss_left, loss(right)),
+        )
+    return (low + high) / 2
+
+
+def _ks_distances(
+    values: np.ndarray, tail_n: np.ndarray, rows: np.ndarray, alpha: np.ndarray
+) -> np.ndarray:
+    """
+    Kolmogorov-Smirnov distance of the sample from `values[row]` on to a power law with the given alpha, for every row.
+    """
+    # Both distribution functions only change at integers, and the empirical one only at the values of the sample. The
+    # largest difference is therefore reached at a value of the sample or just after it, at value + 1. Only the values
+    # from the smallest xmin of the rows on are needed.
+    columns = np.arange(rows[0], len(values))
+    x = values[columns].astype(np.float64)[None, :]
+    in_tail = columns[None, :] >= rows[:, None]
+    a = alpha[:, None]
+    xmin = values[rows].astype(np.float64)[:, None]
+    norm = zeta(a, xmin)
+    # P(X >= x) of the sample and of the power law, at x = value and x = value + 1, using
+    # zeta(a, x + 1) = zeta(a, x) - x^-a
+    tail_next = np.append(tail_n[1:], 0)[columns]
+    sample_at = tail_n[columns][None, :] / tail_n[rows][:, None]
+    sample_after = tail_next[None, :] / tail_n[rows][:, None]
+    model_at = _hurwitz_zeta(a, np.where(in_tail, x, xmin)) / norm
+    model_after = model_at - x**-a / norm
+    distance = np.maximum(
+        np.abs(sample_at - model_at), np.abs(sample_after - model_after)
+    )
+    return np.where(in_tail, distance, 0).max(axis=1)
+
+
+def _hurwitz_zeta(a: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    zeta(a, x) = sum of k^-a for k >= x, broadcast over a and x. For large x, the Euler-Maclaurin expansion is used,
+    which is as accurate as `scipy.special.zeta` there and a lot faster.
+    """
+    a, x = np.broadcast_arrays(a, x)
+    result = (
+        x ** (1 - a) / (a - 1)
+        + x**-a / 2
+        + a * x ** (-a - 1) / 12
+        - a * (a + 1) * (a + 2) * x ** (-a - 3) / 720
+        + a * (a + 1) * (a + 2) * (a + 3) * (a + 4) * x ** (-a - 5) / 30240
+    )
+    # The error of the expansion is of the order of a^7 x^-(a + 7), which is negligible from here on
+    small = x < ZETA_EXPANSION_MIN + 2 * a
+    result[small] = zeta(a[small], x[small])
+    return result
@@ -0,0 +1,32 @@
+"""
+Small random graphs and partitions for the tests.
+"""
+
+import random
+
+import networkx as nx
+
+
+def random_graph(n: int, num_edges: int, seed: int, self_loops: bool) -> nx.DiGraph:
+    """
+    Directed graph on the nodes 0..n-1 with random edges of weight 1, 2 or 3.
+    """
+    rng = random.Random(seed)
+    G = nx.DiGraph()
+    G.add_nodes_from(range(n))
+    while G.number_of_edges() < num_edges:
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v or self_loops:
+            G.add_edge(u, v, weight=rng.choice((1, 1, 2, 3)))
+    return G
+
+
+def random_partition(n: int, num_communities: int, seed: int) -> list[set]:
+    """
+    Partition of the nodes 0..n-1 into at most `num_communities` random communities.
+    """
+    rng = random.Random(seed)
+    partition = [set() for _ in range(num_communities)]
+    for u in range(n):
+        partition[rng.randrange(num_communities)].add(u)
+    return [community for community in partition if community]
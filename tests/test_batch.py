@@ -0,0 +1,117 @@
+"""
+The batched local measures of the CSR engine against the per-neighbour reference measures on networkx graphs.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from algorithm.aggregates import AGGREGATE_FIELDS, CommunityAggregates
+from algorithm.batch import as_batch, neighbourhood
+from algorithm.csr import CSRGraph
+from algorithm.edge_ratio import local_edge_ratio
+from algorithm.intensity_ratio import local_intensity_ratio
+from algorithm.modularity import local_modularity
+from algorithm.modularity_density import local_modularity_density
+from tests.graphs import random_graph, random_partition
+from utils.partition import LabelPartition
+
+LOCAL_MEASURES = [
+    local_edge_ratio,
+    local_intensity_ratio,
+    local_modularity,
+    local_modularity_density,
+]
+
+
+def setup(seed: int, self_loops: bool, num_communities: int):
+    G = random_graph(30, 90, seed, self_loops)
+    partition = random_partition(30, num_communities, seed)
+    labels = LabelPartition.from_sets(partition, list(G.nodes())).labels
+    # The reference measures get the communities as a list of sets indexed by label
+    inner_partition = [set() for _ in partition]
+    for u, label in enumerate(labels.tolist()):
+        inner_partition[label].add(u)
+    return G, CSRGraph.from_networkx(G), labels, inner_partition
+
+
+def reference_gains(measure, G, u, nbh, labels, inner_partition):
+    node_to_community = dict(enumerate(labels.tolist()))
+    return [
+        measure(G, u, neighbour, node_to_community, inner_partition, G.size())
+        for neighbour in nbh.representatives[1:].tolist()
+    ]
+
+
+@pytest.mark.parametrize("self_loops", [False, True])
+@pytest.mark.parametrize("num_communities", [3, 10, 30])
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("measure", LOCAL_MEASURES, ids=lambda f: f.__name__)
+def test_batch_matches_reference(measure, seed, num_communities, self_loops):
+    G, graph, labels, inner_partition = setup(seed, self_loops, num_communities)
+    aggregates = CommunityAggregates(graph, labels)
+    m = graph.size()
+    for u in range(graph.number_of_nodes()):
+        nbh = neighbourhood(graph, u, labels)
+        if len(nbh.communities) == 1:
+            continue
+        expected = reference_gains(measure, G, u, nbh, labels, inner_partition)
+        gains = measure.batch(graph, u, nbh, labels, inner_partition, m, aggregates)
+        assert gains == pytest.approx(expected)
+        # The per-neighbour measures evaluate a single community of a CSRGraph through the batched version
+        assert [
+            measure(graph, u, neighbour, labels, inner_partition, m, aggregates)
+            for neighbour in nbh.representatives[1:].tolist()
+        ] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("measure", LOCAL_MEASURES, ids=lambda f: f.__name__)
+def test_per_neighbour_adapter_matches_reference(measure):
+    G, graph, labels, inner_partition = setup(0, True, 10)
+    aggregates = CommunityAggregates(graph, labels)
+
+    # Without a batch attribute, as_batch calls the measure once per community
+    def unbatched(*args):
+        return measure(*args)
+
+    batch = as_batch(unbatched)
+    for u in range(graph.number_of_nodes()):
+        nbh = neighbourhood(graph, u, labels)
+        if len(nbh.communities) == 1:
+            continue
+        gains = batch(graph, u, nbh, labels, inner_partition, graph.size(), aggregates)
+        assert gains == pytest.approx(
+            reference_gains(measure, G, u, nbh, labels, inner_partition)
+        )
+
+
+@pytest.mark.parametrize("self_loops", [False, True])
+@pytest.mark.parametrize("measure", LOCAL_MEASURES, ids=lambda f: f.__name__)
+def test_batch_matches_reference_after_moves(measure, self_loops):
+    G, graph, labels, inner_partition = setup(1, self_loops, 8)
+    aggregates = CommunityAggregates(graph, labels)
+    m = graph.size()
+    rng = random.Random(1)
+    for _ in range(60):
+        u = rng.randrange(graph.number_of_nodes())
+        nbh = neighbourhood(graph, u, labels)
+        if len(nbh.communities) == 1:
+            continue
+        gains = measure.batch(graph, u, nbh, labels, inner_partition, m, aggregates)
+        assert gains == pytest.approx(
+            reference_gains(measure, G, u, nbh, labels, inner_partition)
+        )
+        # Move u to a random adjacent community, keeping the running totals up to date
+        target = rng.randrange(1, len(nbh.communities))
+        aggregates.move(graph, u, nbh, target)
+        inner_partition[labels[u]].remove(u)
+        labels[u] = nbh.communities[target]
+        inner_partition[labels[u]].add(u)
+    recomputed = CommunityAggregates(graph, labels)
+    for field in AGGREGATE_FIELDS:
+        # Communities after the last non-empty one are not in the recomputed totals
+        expected = getattr(recomputed, field)
+        actual = getattr(aggregates, field)
+        assert np.allclose(actual[: len(expected)], expected)
+        assert not actual[len(expected) :].any()
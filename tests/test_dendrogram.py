@@ -0,0 +1,103 @@
+"""
+The dendrogram of `louvain_dendrogram` against the partitions `louvain_partitions` yields, and its `.npz` files.
+"""
+
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from algorithm.dendrogram import Dendrogram
+from algorithm.edge_ratio import global_edge_ratio, local_edge_ratio
+from algorithm.louvain import louvain_dendrogram, louvain_partitions
+from algorithm.modularity import global_modularity, local_modularity
+
+MEASURES = {
+    "edge_ratio": (global_edge_ratio, local_edge_ratio),
+    "modularity": (global_modularity, local_modularity),
+}
+
+
+def planted_graph(seed: int, node_names=None) -> nx.DiGraph:
+    """
+    Directed graph of 8 dense groups of 6 nodes with a few edges between them, on which Louvain takes several levels
+    for the edge ratio.
+    """
+    G = nx.DiGraph(
+        nx.planted_partition_graph(8, 6, 0.7, 0.03, seed=seed, directed=True)
+    )
+    nx.set_edge_attributes(G, 1, "weight")
+    if node_names is not None:
+        G = nx.relabel_nodes(G, node_names)
+    return G
+
+
+def as_sets(partition) -> list:
+    return sorted(map(sorted, partition))
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("measure", list(MEASURES))
+def test_levels_match_louvain_partitions(measure, seed):
+    G = planted_graph(seed)
+    random.seed(seed)
+    partitions = list(louvain_partitions(G, *MEASURES[measure]))
+    random.seed(seed)
+    dendrogram = louvain_dendrogram(G, *MEASURES[measure])
+    assert len(dendrogram) == len(partitions)
+    for level, partition in enumerate(partitions):
+        assert as_sets(dendrogram.partition(level)) == as_sets(partition)
+        np.testing.assert_array_equal(dendrogram.labels(level), partition.labels)
+    assert as_sets(dendrogram.partition()) == as_sets(partitions[-1])
+
+
+def test_from_partitions():
+    partitions = [
+        [{0, 1}, {2}, {3, 4}, {5}],
+        [{0, 1, 2}, {3, 4, 5}],
+        [{0, 1, 2, 3, 4, 5}],
+    ]
+    dendrogram = Dendrogram.from_partitions(partitions)
+    assert [parent.tolist() for parent in dendrogram.parents] == [
+        [0, 0, 1, 2, 2, 3],
+        [0, 0, 1, 1],
+        [0, 0],
+    ]
+    for level, partition in enumerate(partitions):
+        assert list(dendrogram.partition(level)) == partition
+    assert dendrogram.labels(-2).tolist() == [0, 0, 0, 1, 1, 1]
+
+
+@pytest.mark.parametrize("node_names", [None, "string"])
+def test_save_and_load(tmp_path, node_names):
+    if node_names == "string":
+        node_names = {u: f"case{u}" for u in range(48)}
+    G = planted_graph(0, node_names)
+    random.seed(0)
+    dendrogram = louvain_dendrogram(G, *MEASURES["edge_ratio"])
+    assert len(dendrogram) > 1
+    path = tmp_path / "dendrogram.npz"
+    dendrogram.save(path)
+    loaded = Dendrogram.load(path)
+    assert len(loaded) == len(dendrogram)
+    assert loaded.nodes == dendrogram.nodes
+    for level in range(len(dendrogram)):
+        np.testing.assert_array_equal(loaded.parents[level], dendrogram.parents[level])
+        assert list(loaded.partition(level)) == list(dendrogram.partition(level))
+
+
+def test_save_without_nodes(tmp_path):
+    dendrogram = Dendrogram([[0, 1, 1, 0], [0, 0]])
+    path = tmp_path / "dendrogram.npz"
+    dendrogram.save(path)
+    loaded = Dendrogram.load(path)
+    assert loaded.nodes is None
+    assert list(loaded.partition()) == [{0, 1, 2, 3}]
+    assert list(loaded.partition(0)) == [{0, 3}, {1, 2}]
+
+
+def test_save_object_nodes(tmp_path):
+    dendrogram = Dendrogram([[0, 0]], [frozenset({0}), frozenset({1})])
+    with pytest.raises(ValueError):
+        dendrogram.save(tmp_path / "dendrogram.npz")
@@ -0,0 +1,90 @@
+"""
+The metrics in `algorithm/evaluation.py` against values computed by hand on small partitions.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from algorithm.evaluation import (
+    adjusted_rand_index,
+    community_precision_recall,
+    contingency_table,
+    evaluate,
+    normalized_mutual_info,
+    purity,
+)
+
+# Two true communities of three nodes, found as three communities of two nodes, one of which straddles both
+LABELS_TRUE = [0, 0, 0, 1, 1, 1]
+LABELS_PRED = [0, 0, 1, 1, 2, 2]
+
+
+def test_contingency_table():
+    table = contingency_table(LABELS_TRUE, LABELS_PRED)
+    assert table.toarray().tolist() == [[2, 1, 0], [0, 1, 2]]
+
+
+def test_contingency_table_of_different_nodes():
+    with pytest.raises(ValueError):
+        contingency_table([0, 1], [0, 1, 2])
+    with pytest.raises(ValueError):
+        contingency_table([0, -1], [0, 1])
+
+
+def test_hand_computed_metrics():
+    table = contingency_table(LABELS_TRUE, LABELS_PRED)
+    # The mutual information is 2/3 ln 2, the entropies are ln 2 and ln 3
+    assert normalized_mutual_info(table) == pytest.approx(
+        (2 / 3 * math.log(2)) / ((math.log(2) + math.log(3)) / 2)
+    )
+    # 2 pairs together in both, 6 in the truth and 3 found, out of 15 pairs, so 6 * 3 / 15 are expected by chance
+    assert adjusted_rand_index(table) == pytest.approx((2 - 1.2) / (4.5 - 1.2))
+    assert purity(table) == pytest.approx(5 / 6)
+    precision, recall = community_precision_recall(table)
+    np.testing.assert_allclose(precision, [1, 1 / 2, 1])
+    np.testing.assert_allclose(recall, [2 / 3, 2 / 3])
+
+
+def test_same_partition_with_other_labels():
+    result = evaluate([0, 0, 1, 1, 2], [2, 2, 0, 0, 1])
+    assert result["nmi"] == pytest.approx(1)
+    assert result["ari"] == pytest.approx(1)
+    assert result["purity"] == 1
+    np.testing.assert_array_equal(result["precision"], [1, 1, 1])
+    np.testing.assert_array_equal(result["recall"], [1, 1, 1])
+
+
+@pytest.mark.parametrize("n", [1, 5])
+def test_one_community(n):
+    result = evaluate(np.zeros(n, dtype=int), np.zeros(n, dtype=int))
+    assert result["nmi"] == 1
+    assert result["ari"] == 1
+    assert result["purity"] == 1
+
+
+def test_every_node_alone():
+    result = evaluate(np.arange(5), np.arange(5))
+    assert result["nmi"] == pytest.approx(1)
+    assert result["ari"] == 1
+    assert result["purity"] == 1
+
+
+def test_every_node_alone_against_one_community():
+    table = contingency_table(np.zeros(5, dtype=int), np.arange(5))
+    # Knowing the found community tells nothing about the single true one, and no pair is together in both
+    assert normalized_mutual_info(table) == 0
+    assert adjusted_rand_index(table) == 0
+    assert purity(table) == 1
+    precision, recall = community_precision_recall(table)
+    np.testing.assert_array_equal(precision, np.ones(5))
+    np.testing.assert_array_equal(recall, [1 / 5])
+
+
+def test_labels_without_nodes():
+    precision, recall = community_precision_recall(
+        contingency_table([0, 0, 2], [1, 1, 1])
+    )
+    np.testing.assert_array_equal(precision, [0, 2 / 3])
+    np.testing.assert_array_equal(recall, [1, 0, 1])
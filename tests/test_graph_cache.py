@@ -0,0 +1,72 @@
+"""
+The cached benchmark graphs of `graph_cache.py` against the graphs `generate_fs_graph` generates.
+"""
+
+import random
+
+import networkx as nx
+import pytest
+
+import graph_cache
+import graph_generation_fs
+from graph_cache import cached_fs_graph, fs_graph_key
+from graph_generation_fs import generate_fs_graph
+
+
+@pytest.fixture(autouse=True)
+def clear_memory_cache():
+    graph_cache._load_fs_graph.cache_clear()
+    yield
+    graph_cache._load_fs_graph.cache_clear()
+
+
+def generate(n: int, seed: int):
+    G = generate_fs_graph(n, seed=seed)
+    return G, random.getstate()
+
+
+def assert_same_graph(G: nx.DiGraph, expected: nx.DiGraph):
+    assert list(G.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(G.edges(data=True)) == list(expected.edges(data=True))
+    assert G.graph["partition"] == expected.graph["partition"]
+
+
+def test_generated_and_read_graph(tmp_path):
+    expected, expected_state = generate(300, 1)
+    random.seed(0)
+    assert_same_graph(cached_fs_graph(300, 1, tmp_path), expected)
+    assert random.getstate() == expected_state
+    assert [path.name for path in tmp_path.iterdir()] == [f"{fs_graph_key(300, 1)}.npz"]
+
+    # Read from the file, with the random state generate_fs_graph left behind
+    graph_cache._load_fs_graph.cache_clear()
+    random.seed(0)
+    assert_same_graph(cached_fs_graph(300, 1, tmp_path), expected)
+    assert random.getstate() == expected_state
+
+
+def test_memory_cache_hit_restores_random_state(tmp_path):
+    _, expected_state = generate(300, 1)
+    G = cached_fs_graph(300, 1, tmp_path)
+    random.seed(0)
+    assert cached_fs_graph(300, 1, tmp_path) is G
+    assert random.getstate() == expected_state
+
+
+def test_other_seed_and_size(tmp_path):
+    cached_fs_graph(300, 1, tmp_path)
+    assert_same_graph(cached_fs_graph(300, 2, tmp_path), generate(300, 2)[0])
+    assert_same_graph(cached_fs_graph(200, 1, tmp_path), generate(200, 1)[0])
+    assert len(list(tmp_path.iterdir())) == 3
+
+
+def test_key_follows_generator_constants(tmp_path, monkeypatch):
+    key = fs_graph_key(300, 1)
+    G = cached_fs_graph(300, 1, tmp_path)
+    monkeypatch.setattr(
+        graph_generation_fs, "AVG_DEGREE", graph_generation_fs.AVG_DEGREE + 1
+    )
+    assert fs_graph_key(300, 1) != key
+    # Neither the file nor the graph in memory is used for the changed generator
+    assert cached_fs_graph(300, 1, tmp_path) is not G
+    assert len(list(tmp_path.iterdir())) == 2
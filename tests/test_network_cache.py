@@ -0,0 +1,103 @@
+"""
+The network cache of `network_cache.py`: when it rebuilds a network and which cached networks it removes.
+"""
+
+import os
+
+import numpy as np
+
+from network_cache import CitationNetwork, cached_network, source_key
+from network_ingest import ingest_network
+
+
+def write_csv_pair(directory, edges: str):
+    directory.mkdir(parents=True, exist_ok=True)
+    edge_csv = directory / "edges.csv"
+    metadata_csv = directory / "metadata.csv"
+    edge_csv.write_text(edges)
+    metadata_csv.write_text("a,court1\nc,court2\n")
+    return edge_csv, metadata_csv
+
+
+def open_counting(source_files, cache_dir, builds: list) -> CitationNetwork:
+    def build():
+        builds.append(source_files)
+        return ingest_network(*source_files, report=lambda message: None)
+
+    return cached_network(source_files, build, cache_dir)
+
+
+def assert_same_network(network: CitationNetwork, expected: CitationNetwork):
+    for field in CitationNetwork._fields:
+        np.testing.assert_array_equal(getattr(network, field), getattr(expected, field))
+
+
+def test_built_once(tmp_path):
+    source_files = write_csv_pair(tmp_path / "source", "a,b\nb,c\nc,a\n")
+    cache_dir = tmp_path / "cache"
+    builds = []
+    network = open_counting(source_files, cache_dir, builds)
+    assert_same_network(
+        network, ingest_network(*source_files, report=lambda message: None)
+    )
+    assert isinstance(network.indices, np.memmap)
+    assert_same_network(open_counting(source_files, cache_dir, builds), network)
+    assert len(builds) == 1
+    [source_dir] = cache_dir.iterdir()
+    assert source_dir.name == source_key(*source_files)
+    assert len(list(source_dir.iterdir())) == 1
+
+
+def test_rebuilt_after_change(tmp_path):
+    source_files = write_csv_pair(tmp_path / "source", "a,b\nb,c\nc,a\n")
+    edge_csv = source_files[0]
+    cache_dir = tmp_path / "cache"
+    builds = []
+    open_counting(source_files, cache_dir, builds)
+    [old] = (cache_dir / source_key(*source_files)).iterdir()
+
+    # The same contents with another modification time
+    stat = edge_csv.stat()
+    os.utime(edge_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    open_counting(source_files, cache_dir, builds)
+    assert len(builds) == 2
+    [new] = (cache_dir / source_key(*source_files)).iterdir()
+    assert new != old
+
+    # Other contents of the same size and modification time
+    stat = edge_csv.stat()
+    edge_csv.write_text("a,c\nb,c\nc,a\n")
+    os.utime(edge_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    network = open_counting(source_files, cache_dir, builds)
+    assert len(builds) == 3
+    assert_same_network(
+        network, ingest_network(*source_files, report=lambda message: None)
+    )
+
+
+def test_only_own_stale_networks_removed(tmp_path):
+    source_files = write_csv_pair(tmp_path / "source", "a,b\nb,c\nc,a\n")
+    other_files = write_csv_pair(tmp_path / "other", "a,b\n")
+    cache_dir = tmp_path / "cache"
+    builds = []
+    open_counting(source_files, cache_dir, builds)
+    open_counting(other_files, cache_dir, builds)
+    source_dir = cache_dir / source_key(*source_files)
+    other_dir = cache_dir / source_key(*other_files)
+    [other_network] = other_dir.iterdir()
+    # A network another process is still writing
+    writing = source_dir / "0123.4567.tmp"
+    writing.mkdir()
+
+    stat = source_files[0].stat()
+    os.utime(source_files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    open_counting(source_files, cache_dir, builds)
+    assert len(builds) == 3
+    assert len([path for path in source_dir.iterdir() if path != writing]) == 1
+    assert writing.exists()
+    assert list(other_dir.iterdir()) == [other_network]
+    assert_same_network(
+        open_counting(other_files, cache_dir, builds),
+        ingest_network(*other_files, report=lambda message: None),
+    )
+    assert len(builds) == 3
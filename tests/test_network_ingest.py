@@ -0,0 +1,81 @@
+"""
+The streaming ingest of the citation network against `nx.read_edgelist`, which `load_network` used before.
+"""
+
+import csv
+import random
+
+import networkx as nx
+import pytest
+
+from network_ingest import MIN_CHUNK_BYTES, ingest_network
+
+
+def read_with_networkx(edge_csv, metadata_csv) -> nx.DiGraph:
+    G = nx.read_edgelist(edge_csv, delimiter=",", create_using=nx.DiGraph())
+    with open(metadata_csv, "r") as f:
+        for row in csv.reader(f):
+            if row[0] in G.nodes:
+                G.nodes[row[0]]["court"] = row[1]
+    return G
+
+
+def assert_same_graph(G: nx.DiGraph, expected: nx.DiGraph):
+    assert list(G.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(G.edges()) == list(expected.edges())
+
+
+def write_csv_pair(tmp_path, edge_lines, metadata_rows):
+    edge_csv = tmp_path / "edges.csv"
+    metadata_csv = tmp_path / "metadata.csv"
+    edge_csv.write_text("".join(f"{line}\n" for line in edge_lines))
+    with open(metadata_csv, "w", newline="") as f:
+        csv.writer(f).writerows(metadata_rows)
+    return edge_csv, metadata_csv
+
+
+def test_small_network(tmp_path):
+    edge_csv, metadata_csv = write_csv_pair(
+        tmp_path,
+        [
+            "# citing,cited",
+            "a,b",
+            "b,c  # trailing comment",
+            "a,b",
+            "c,a",
+            "lonely",
+            "",
+            "d,d",
+            "b,a",
+        ],
+        [["a", "court1"], ["c", "court2"], ["x", "court3"], ["a", "court3"]],
+    )
+    network = ingest_network(edge_csv, metadata_csv, report=lambda message: None)
+    assert network.number_of_edges() == 5
+    assert_same_graph(network.to_networkx(), read_with_networkx(edge_csv, metadata_csv))
+
+
+@pytest.mark.parametrize("edge_lines", [[], ["# only a comment"]])
+def test_network_without_edges(tmp_path, edge_lines):
+    edge_csv, metadata_csv = write_csv_pair(
+        tmp_path, edge_lines, [["a", "court1"], ["b", "court2"]]
+    )
+    network = ingest_network(edge_csv, metadata_csv, report=lambda message: None)
+    assert network.number_of_nodes() == 0
+    assert network.number_of_edges() == 0
+    assert_same_graph(network.to_networkx(), read_with_networkx(edge_csv, metadata_csv))
+
+
+def test_network_read_in_chunks(tmp_path):
+    rng = random.Random(0)
+    edge_lines = [
+        f"case{rng.randrange(2000)},case{rng.randrange(2000)}" for _ in range(20_000)
+    ]
+    metadata_rows = [[f"case{i}", f"court{i % 7}"] for i in range(0, 2500, 3)]
+    edge_csv, metadata_csv = write_csv_pair(tmp_path, edge_lines, metadata_rows)
+    # The file is several times larger than the smallest chunk, so lines are split across chunks
+    assert edge_csv.stat().st_size > 3 * MIN_CHUNK_BYTES
+    network = ingest_network(
+        edge_csv, metadata_csv, memory_budget=0, report=lambda message: None
+    )
+    assert_same_graph(network.to_networkx(), read_with_networkx(edge_csv, metadata_csv))
@@ -0,0 +1,68 @@
+"""
+`LabelPartition` against the list of sets it stands in for.
+"""
+
+import numpy as np
+import pytest
+
+from utils.partition import LabelPartition
+
+SETS = [{0, 3}, {1, 4, 5}, {2}]
+NODES = ["a", "b", "c", "d", "e", "f"]
+
+
+def test_behaves_like_sets():
+    partition = LabelPartition.from_sets(SETS)
+    assert partition.labels.tolist() == [0, 1, 2, 0, 1, 1]
+    assert len(partition) == len(SETS)
+    assert list(partition) == SETS
+    assert partition.to_sets() == SETS
+    assert [partition[i] for i in range(len(SETS))] == SETS
+    assert partition[-1] == SETS[-1]
+    assert partition[1:] == SETS[1:]
+    with pytest.raises(IndexError):
+        partition[len(SETS)]
+    assert partition.sizes().tolist() == [2, 3, 1]
+    assert [partition.community_of(u) for u in range(6)] == [0, 1, 2, 0, 1, 1]
+
+
+def test_named_nodes():
+    named_sets = [{NODES[u] for u in community} for community in SETS]
+    partition = LabelPartition.from_sets(named_sets, NODES)
+    assert partition.labels.tolist() == [0, 1, 2, 0, 1, 1]
+    assert list(partition) == named_sets
+    assert partition.community_of("e") == 1
+    assert partition.members(1).tolist() == [1, 4, 5]
+    # Converting again to other nodes in another order relabels the positions
+    reordered = LabelPartition.from_sets(partition, NODES[::-1])
+    assert reordered.labels.tolist() == [1, 1, 0, 2, 1, 0]
+    assert list(reordered) == named_sets
+    assert LabelPartition.from_sets(partition, list(NODES)) is partition
+
+
+def test_missing_node():
+    with pytest.raises(ValueError):
+        LabelPartition.from_sets([{0, 1}, {3}])
+    with pytest.raises(ValueError):
+        LabelPartition.from_sets([{0, 1}, {-1}])
+    with pytest.raises(ValueError):
+        LabelPartition.from_sets([{"a"}], ["a", "b"])
+    with pytest.raises(ValueError):
+        LabelPartition([0, 1], NODES)
+
+
+def test_relabel_and_compact():
+    partition = LabelPartition([0, 2, 2, 4])
+    assert len(partition) == 5
+    assert list(partition) == [{0}, set(), {1, 2}, set(), {3}]
+    compact = partition.compact()
+    assert list(compact) == [{0}, {1, 2}, {3}]
+    assert compact.compact() is compact
+    merged = compact.relabel(np.array([0, 1, 0]))
+    assert list(merged) == [{0, 3}, {1, 2}]
+
+
+def test_empty_partition():
+    partition = LabelPartition.from_sets([])
+    assert len(partition) == 0
+    assert list(partition) == []
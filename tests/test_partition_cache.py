@@ -0,0 +1,123 @@
+"""
+The cached Louvain partitions of `partition_cache.py` against `louvain_communities`.
+"""
+
+import os
+import random
+
+import networkx as nx
+import numpy as np
+
+from algorithm.edge_ratio import global_edge_ratio, local_edge_ratio
+from algorithm.louvain import louvain_communities
+from algorithm.modularity import global_modularity, local_modularity
+from partition_cache import cached_louvain_communities, evict_partitions
+
+
+def planted_graph() -> nx.DiGraph:
+    G = nx.DiGraph(nx.planted_partition_graph(6, 6, 0.7, 0.05, seed=0, directed=True))
+    nx.set_edge_attributes(G, 1, "weight")
+    return G
+
+
+def as_sets(partition) -> list:
+    return sorted(map(sorted, partition))
+
+
+def test_miss_and_hit(tmp_path):
+    G = planted_graph()
+    random.seed(1)
+    expected = louvain_communities(G, global_edge_ratio, local_edge_ratio)
+    state_after = random.getstate()
+
+    random.seed(1)
+    partition = cached_louvain_communities(
+        G, global_edge_ratio, local_edge_ratio, tmp_path
+    )
+    assert as_sets(partition) == as_sets(expected)
+    assert random.getstate() == state_after
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+    # A hit gives the same partition of the same nodes, and leaves the random state alone
+    random.seed(1)
+    state_before = random.getstate()
+    cached = cached_louvain_communities(
+        G, global_edge_ratio, local_edge_ratio, tmp_path
+    )
+    assert random.getstate() == state_before
+    assert cached.nodes == list(G.nodes())
+    assert as_sets(cached) == as_sets(expected)
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+
+def test_key(tmp_path):
+    G = planted_graph()
+    for seed in (1, 2):
+        random.seed(seed)
+        cached_louvain_communities(G, global_edge_ratio, local_edge_ratio, tmp_path)
+    random.seed(1)
+    cached_louvain_communities(G, global_modularity, local_modularity, tmp_path)
+    random.seed(1)
+    cached_louvain_communities(
+        G, global_edge_ratio, local_edge_ratio, tmp_path, engine="csr"
+    )
+    G.remove_edge(*next(iter(G.edges())))
+    random.seed(1)
+    cached_louvain_communities(G, global_edge_ratio, local_edge_ratio, tmp_path)
+    assert len(list(tmp_path.glob("*.npy"))) == 5
+
+
+def test_observer_bypasses_cache(tmp_path):
+    G = planted_graph()
+    random.seed(1)
+    expected = cached_louvain_communities(
+        G, global_edge_ratio, local_edge_ratio, tmp_path
+    )
+    [path] = tmp_path.glob("*.npy")
+    written = path.stat().st_mtime_ns
+
+    stats = []
+    random.seed(1)
+    partition = cached_louvain_communities(
+        G, global_edge_ratio, local_edge_ratio, tmp_path, observer=stats.append
+    )
+    # The observer saw every level, although the partition was cached
+    assert stats
+    assert as_sets(partition) == as_sets(expected)
+    assert list(tmp_path.glob("*.npy")) == [path]
+    assert path.stat().st_mtime_ns == written
+
+
+def write_file(path, size: int, mtime: int):
+    path.write_bytes(bytes(size))
+    os.utime(path, (mtime, mtime))
+
+
+def test_evict_least_recently_used(tmp_path):
+    write_file(tmp_path / "old.npy", 100, 1_000)
+    write_file(tmp_path / "middle.npy", 100, 2_000)
+    write_file(tmp_path / "new.npy", 100, 3_000)
+    # A partition that is still being written, older and larger than the rest
+    write_file(tmp_path / "writing.1234.tmp.npy", 1_000, 500)
+    evict_partitions(tmp_path, 250)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "middle.npy",
+        "new.npy",
+        "writing.1234.tmp.npy",
+    ]
+    evict_partitions(tmp_path, 0)
+    assert [path.name for path in tmp_path.iterdir()] == ["writing.1234.tmp.npy"]
+
+
+def test_hit_marks_partition_as_used(tmp_path):
+    G = planted_graph()
+    random.seed(1)
+    cached_louvain_communities(G, global_edge_ratio, local_edge_ratio, tmp_path)
+    [path] = tmp_path.glob("*.npy")
+    os.utime(path, (1_000, 1_000))
+    write_file(tmp_path / "other.npy", path.stat().st_size, 2_000)
+    random.seed(1)
+    cached_louvain_communities(G, global_edge_ratio, local_edge_ratio, tmp_path)
+    evict_partitions(tmp_path, path.stat().st_size)
+    assert list(tmp_path.glob("*.npy")) == [path]
+    assert np.load(path).shape == (G.number_of_nodes(),)
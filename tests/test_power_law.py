@@ -0,0 +1,63 @@
+"""
+The power law fit in `power_law.py` on seeded samples of known power laws.
+"""
+
+import json
+
+import numpy as np
+import pytest
+from scipy.special import zeta
+
+from power_law import ZETA_EXPANSION_MIN, PowerLawFit, _hurwitz_zeta, fit_power_law
+
+
+@pytest.mark.parametrize("alpha", [2.2, 2.5, 3.0])
+def test_zipf_sample(alpha):
+    data = np.random.default_rng(0).zipf(alpha, 50_000)
+    fit = fit_power_law(data, cache_dir=None)
+    assert fit.alpha == pytest.approx(alpha, abs=0.03)
+    assert fit.xmin == 1
+    assert fit.n_tail == len(data)
+
+
+@pytest.mark.parametrize("alpha", [2.2, 2.5, 3.0])
+def test_zipf_tail_above_uniform_body(alpha):
+    # A power law from 4 on, below a body of uniform small values that does not follow it
+    rng = np.random.default_rng(0)
+    tail = rng.zipf(alpha, 400_000)
+    tail = tail[tail >= 4][:20_000]
+    body = rng.integers(1, 4, 20_000)
+    fit = fit_power_law(np.concatenate([body, tail]), cache_dir=None)
+    assert fit.alpha == pytest.approx(alpha, abs=0.05)
+    assert 4 <= fit.xmin <= 5
+    assert fit.n_tail == np.sum(tail >= fit.xmin)
+
+
+def test_hurwitz_zeta_matches_scipy():
+    a = np.array([1.1, 1.5, 2.5, 4.0, 8.0])[:, None]
+    # Values of x on both sides of where the expansion takes over
+    x = np.floor(ZETA_EXPANSION_MIN + 2 * a) + np.arange(-3, 4)
+    np.testing.assert_allclose(_hurwitz_zeta(a, x), zeta(a, x), rtol=1e-10)
+
+
+@pytest.mark.parametrize("data", [[], [0, -1], [3, 3, 3]])
+def test_sample_without_two_distinct_values(data):
+    with pytest.raises(ValueError):
+        fit_power_law(data, cache_dir=None)
+
+
+def test_cached_fit(tmp_path):
+    data = np.random.default_rng(0).zipf(2.5, 1000)
+    fit = fit_power_law(data, cache_dir=tmp_path)
+    assert fit == fit_power_law(data, cache_dir=None)
+    [path] = tmp_path.iterdir()
+    assert path.suffix == ".json"
+    assert PowerLawFit(**json.loads(path.read_text())) == fit
+    # The fit is read back from the cache, regardless of the order of the sample
+    written = path.stat().st_mtime_ns
+    assert fit_power_law(data[::-1], cache_dir=tmp_path) == fit
+    assert path.stat().st_mtime_ns == written
+    assert list(tmp_path.iterdir()) == [path]
+    # Other settings are cached separately
+    fit_power_law(data, min_tail=10, cache_dir=tmp_path)
+    assert len(list(tmp_path.iterdir())) == 2
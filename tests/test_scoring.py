@@ -0,0 +1,62 @@
+"""
+The vectorized scores in `algorithm/scoring.py` against the networkx reference implementations of the measures.
+"""
+
+import pytest
+
+from algorithm.csr import CSRGraph
+from algorithm.edge_ratio import global_edge_ratio
+from algorithm.intensity_ratio import global_intensity_ratio
+from algorithm.modularity import global_modularity
+from algorithm.modularity_density import global_modularity_density
+from algorithm.scoring import SCORES, score_report
+from assess import nmi_score
+from tests.graphs import random_graph, random_partition
+from utils.partition import LabelPartition
+
+GLOBAL_MEASURES = {
+    "edge_ratio": global_edge_ratio,
+    "intensity_ratio": global_intensity_ratio,
+    "modularity": global_modularity,
+    "modularity_density": global_modularity_density,
+}
+
+
+@pytest.mark.parametrize("self_loops", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("measure", list(SCORES))
+def test_scores_match_global_measures(measure, seed, self_loops):
+    G = random_graph(40, 120, seed, self_loops)
+    graph = CSRGraph.from_networkx(G)
+    m = G.size()
+    for num_communities in (1, 5, 40):
+        partition = random_partition(40, num_communities, seed)
+        expected = GLOBAL_MEASURES[measure](G, partition, m)
+        labels = LabelPartition.from_sets(partition, list(G.nodes())).labels
+        assert SCORES[measure](graph, labels, m) == pytest.approx(expected)
+        # The global measures use the vectorized scores for a CSRGraph
+        assert GLOBAL_MEASURES[measure](graph, partition, m) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("self_loops", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+def test_score_report_matches_global_measures(seed, self_loops):
+    G = random_graph(50, 150, seed, self_loops)
+    m = G.size()
+    partition = random_partition(50, 6, seed)
+    ground_truth = random_partition(50, 4, seed + 100)
+    report = score_report(G, partition, ground_truth)
+    for measure, global_measure in GLOBAL_MEASURES.items():
+        assert report[measure] == pytest.approx(global_measure(G, partition, m))
+    assert report["size"] == len(partition)
+    assert report["nmi"] == pytest.approx(nmi_score(ground_truth, partition))
+
+
+def test_score_report_of_label_partition():
+    G = random_graph(30, 90, 0, True)
+    partition = random_partition(30, 4, 0)
+    label_partition = LabelPartition.from_sets(partition, list(G.nodes()))
+    report = score_report(CSRGraph.from_networkx(G), label_partition, partition)
+    assert report == pytest.approx(
+        {**score_report(G, partition), "nmi": 1.0, "ari": 1.0, "purity": 1.0}
+    )
@@ -0,0 +1,142 @@
+"""
+Compact partition type, see `LabelPartition`. `utils.types.Partition` is the list of sets it can be converted from and
+to.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+from utils.types import Partition
+
+
+class LabelPartition:
+    """
+    Partition stored as an int32 label array, where `labels[i]` is the community of the i-th node. That takes 4 bytes
+    per node instead of a Python set per community, and looking up the community of a node is O(1).
+
+    It can be used wherever a list of sets is expected: `len` is the number of communities, and indexing or iterating
+    gives the members of each community as a set. Those sets are built on demand from one sorted copy of the labels,
+    which is computed the first time it is needed.
+
+    The labels should not be modified after the partition is created, use `relabel` or `compact` instead.
+    """
+
+    def __init__(self, labels, nodes: Sequence = None):
+        """
+        :param labels: Non-negative community label of every node. Labels without nodes are empty communities, see
+            `compact`.
+        :param nodes: The node at every position of `labels`. Defaults to the nodes 0..n-1.
+        """
+        self.labels = np.asarray(labels, dtype=np.int32)
+        if self.labels.ndim != 1:
+            raise ValueError("Labels must be a one-dimensional array")
+        if nodes is not None and len(nodes) != len(self.labels):
+            raise ValueError(f"Got {len(self.labels)} labels for {len(nodes)} nodes")
+        self.nodes = nodes
+        self.num_communities = int(self.labels.max(initial=-1)) + 1
+        self._node_index = None
+        self._order = None
+        self._bounds = None
+
+    @classmethod
+    def from_sets(cls, partition: Partition, nodes: Sequence = None):
+        """
+        Convert a list of sets. With `nodes`, the labels follow their order, otherwise the nodes must be 0..n-1. A
+        `LabelPartition` is returned as it is, unless it labels the nodes in a different order.
+        """
+        if isinstance(partition, cls):
+            if (
+                nodes is None
+                or partition.nodes is nodes
+                or list(partition.nodes or ()) == list(nodes)
+            ):
+                return partition
+            return cls([partition.community_of(u) for u in nodes], nodes)
+        if nodes is None:
+            n = sum(map(len, partition))
+            labels = np.full(n, -1, dtype=np.int32)
+            for i, community in enumerate(partition):
+                members = np.fromiter(community, dtype=np.int64, count=len(community))
+                if len(members) and (members.min() < 0 or members.max() >= n):
+                    raise ValueError("The nodes of the partition must be 0..n-1")
+                labels[members] = i
+        else:
+            node_index = {u: i for i, u in enumerate(nodes)}
+            labels = np.full(len(node_index), -1, dtype=np.int32)
+            for i, community in enumerate(partition):
+                labels[[node_index[u] for u in community]] = i
+        if (labels < 0).any():
+            raise ValueError("The partition does not contain every node")
+        return cls(labels, nodes)
+
+    def to_sets(self) -> Partition:
+        """
+        Convert to a list of sets, including empty communities.
+        """
+        return list(self)
+
+    def community_of(self, u) -> int:
+        """
+        The community of node u.
+        """
+        if self.nodes is None:
+            return int(self.labels[u])
+        if self._node_index is None:
+            self._node_index = {v: i for i, v in enumerate(self.nodes)}
+        return int(self.labels[self._node_index[u]])
+
+    def members(self, community: int) -> np.ndarray:
+        """
+        Positions in `labels` of the nodes of a community, in increasing order.
+        """
+        if self._order is None:
+            self._order = np.argsort(self.labels, kind="stable")
+            self._bounds = np.searchsorted(
+                self.labels[self._order], np.arange(self.num_communities + 1)
+            )
+        return self._order[self._bounds[community] : self._bounds[community + 1]]
+
+    def sizes(self) -> np.ndarray:
+        """
+        Number of nodes in every community.
+        """
+        return np.bincount(self.labels, minlength=self.num_communities)
+
+    def relabel(self, mapping) -> "LabelPartition":
+        """
+        Partition in which every node of community c is in community `mapping[c]`. Mapping several communities to the
+        same label merges them.
+        """
+        return LabelPartition(
+            np.asarray(mapping, dtype=np.int32)[self.labels], self.nodes
+        )
+
+    def compact(self) -> "LabelPartition":
+        """
+        Partition without empty communities, with the remaining communities numbered 0..k-1 in the same order.
+        """
+        present = self.sizes() > 0
+        if present.all():
+            return self
+        return self.relabel(np.cumsum(present) - 1)
+
+    def __len__(self) -> int:
+        return self.num_communities
+
+    def __getitem__(self, community):
+        if isinstance(community, slice):
+            return [self[i] for i in range(self.num_communities)[community]]
+        if not -self.num_communities <= community < self.num_communities:
+            raise IndexError("community index out of range")
+        members = self.members(community % self.num_communities).tolist()
+        if self.nodes is None:
+            return set(members)
+        return {self.nodes[i] for i in members}
+
+    def __iter__(self):
+        for community in range(self.num_communities):
+            yield self[community]
+
+    def __repr__(self) -> str:
+        return f"LabelPartition({self.num_communities} communities of {len(self.labels)} nodes)"